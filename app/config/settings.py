@@ -20,6 +20,73 @@ class Settings(BaseSettings):
     VIDEO_DIR: Path = Path(parent_dir, v_download_folder)
     video_length_seconds: int = 1800
     CAPTURE_LENGTH: str = f"{video_length_seconds}"
+    # "segment" keeps one ffmpeg per broadcast and rolls files every video_length_seconds,
+    # by duration only: the segment muxer has no size trigger and -fs would end the capture
+    # "timed" restarts ffmpeg after each short -t capture
+    capture_mode: Literal["segment", "timed"] = "segment"
+    # "native" downloads HLS segments in process and only runs ffmpeg to remux
+    capture_engine: Literal["ffmpeg", "native"] = "ffmpeg"
+    hls_segment_workers: int = 4
+    max_captures: int = 40
+    finalize_workers: int = 2
+    session_gap_seconds: int = 300
+    min_free_gb: int = 20
+    # record to DIRECTORIES[0] and move finished files to the other mounts
+    use_staging: bool = True
+    archive_mb_per_sec: int = 80
+    # 0 disables the downstream budget and the per class height caps,
+    # captures then keep the stream's default variant
+    bandwidth_budget_kbps: int = 0
+    edge_url_ttl: int = 600
+    # opt in, runs the whole site roomlist scrape on the online status loop
+    # and trusts its sightings for online_index_ttl seconds
+    scrape_roomlist: bool = False
+    online_index_ttl: int = 960
+    # refetch the top pages every cycle, stable tail pages at most every max_skip
+    incremental_scrape: bool = True
+    roomlist_top_pages: int = 5
+    roomlist_max_skip: int = 4
+    scrape_workers: int = 6
+    ingest_batch_size: int = 500
+    ingest_queue_size: int = 8
+    # db housekeeping runs once the wal has been quiet this long
+    maintenance_idle_seconds: int = 30
+    maintenance_interval: int = 3600
+    integrity_interval: int = 86400
+    vacuum_pages: int = 2000
+    # per streamer status checks, likely live every minute, dormant every hour
+    poll_min_interval: int = 60
+    poll_max_interval: int = 3600
+    poll_tick: float = 5.0
+    # session history and the pre-warm ahead of usual start times
+    history_gap_seconds: int = 1800
+    prewarm_every: int = 300
+    prewarm_lead_seconds: int = 300
+    prewarm_bin_minutes: int = 30
+    prewarm_min_sessions: int = 3
+    prewarm_lookback_days: int = 28
+    # time series retention per tier, minute rows roll up hourly, hours daily
+    stats_minute_days: int = 3
+    stats_hour_days: int = 30
+    stats_day_days: int = 730
+    # queued db writes within this window share one commit
+    db_write_window_ms: int = 5
+    # sync callers give up on a write the writer thread hasn't committed by then
+    db_write_timeout: float = 30.0
+    # transport errors are retried with jittered backoff, slow requests hedged
+    retry_attempts: int = 2
+    retry_base_delay: float = 0.5
+    hedge_quantile: float = 0.95
+    http_max_connections: int = 100
+    http_max_keepalive: int = 20
+    http_keepalive_expiry: float = 120.0
+    # starting requests per second, adapted between rate/10 and rate*5
+    rate_limits: dict[str, float] = {
+        "chaturbate.com": 2.0,
+        "jpeg.live.mmcdn.com": 20.0,
+    }
+    # only applied with a bandwidth budget
+    variant_max_height: dict[str, int] = {"high": 1080, "normal": 720, "low": 480}
     default_cli_prompt: str = "$"
     log_level: Literal[20] = INFO
     datetime: ClassVar = datetime.now().replace(microsecond=0)
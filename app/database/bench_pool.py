@@ -0,0 +1,72 @@
+"""Per query overhead of a fresh connection against the pooled connections.
+
+    python -m app.database.bench_pool [queries]
+"""
+
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+from app.config.settings import get_settings
+from app.database.pool import ConnectionPool
+
+config = get_settings()
+
+SQL = "SELECT follow, block_date, domain FROM chaturbate WHERE streamer_name=?"
+
+
+def fresh_connection(path: Path, name_: str):
+    # what query_db2 did before the pool, connect plus a pragma script per call
+    with sqlite3.connect(path) as conn:
+        conn.executescript("PRAGMA synchronous=NORMAL;")
+        cursor = conn.cursor()
+        cursor.executescript(
+            """
+            PRAGMA synchronous=OFF;
+            pragma page_size = 32768;
+            PRAGMA mmap_size = 1000000000;
+            """
+        )
+        cursor.execute(SQL, (name_,))
+        return cursor.fetchone()
+
+
+def pooled(pool: ConnectionPool, name_: str):
+    with pool.read() as cursor:
+        cursor.execute(SQL, (name_,))
+        return cursor.fetchone()
+
+
+def seed(path: Path, rows: int) -> list[str]:
+    names = [f"streamer_{x}" for x in range(rows)]
+    with sqlite3.connect(path) as conn:
+        conn.executescript(Path(config.DB_TABLES).read_text(encoding="utf-8"))
+        conn.executemany(
+            "INSERT INTO chaturbate (streamer_name) VALUES (?)", [(x,) for x in names]
+        )
+    return names
+
+
+def bench(queries: int = 2000) -> None:
+    with tempfile.TemporaryDirectory() as folder:
+        path = Path(folder, "bench.sqlite3")
+        names = seed(path, 5000)
+        pool = ConnectionPool(path)
+
+        for label, run in (
+            ("fresh connection", lambda x: fresh_connection(path, x)),
+            ("pooled", lambda x: pooled(pool, x)),
+        ):
+            start_ = perf_counter()
+            for i in range(queries):
+                run(names[i % len(names)])
+            elapsed = perf_counter() - start_
+            print(f"{label:>16}: {round(elapsed / queries * 1e6, 1)} us/query")
+
+        pool.close()
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
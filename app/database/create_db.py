@@ -1,11 +1,12 @@
 import logging
 import os
 import sqlite3
-from contextlib import contextmanager
+from contextlib import closing, contextmanager
 from termcolor import colored
 from app.config.settings import get_settings
 from app.database.db_query import db_validate_pid
 from app.database.db_writes import db_remove_pid
+from app.database.migrations import migrate
 from app.utils.general_utils import display_pragma
 
 
@@ -45,25 +46,46 @@ def db_init_connect():
         yield conn
 
 
-def db_init() -> None:
-    prag_optimize = "pragma integrity_check; PRAGMA optimize; ANALYZE; VACUUM;"
+def db_create() -> None:
+    log.info(colored("Creating database folder", "cyan"))
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        # auto_vacuum only sticks before journal_mode=WAL and the first table,
+        # a plain connection here, db_init_connect would switch to WAL first
+        with closing(sqlite3.connect(DB_PATH)) as conn:
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            with open(DB_TABLES, "r", encoding="utf-8") as file:
+                conn.executescript(file.read())
+            log.info(colored("Database inital setup complete", "cyan"))
+
+    except sqlite3.OperationalError as error:
+        log.error(error)
+
+
+def db_incremental_vacuum(conn: sqlite3.Connection) -> None:
+    """One time switch of an older database, maintenance then vacuums in steps"""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return None
 
+    # a full VACUUM rewrites the file, done here before any writer is running
+    log.info(colored("Switching database to incremental vacuum, this runs once", "cyan"))
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+def db_init() -> None:
     # setup database
     if not DB_PATH.exists():
-        log.info(colored("Creating database folder", "cyan"))
-        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-        try:
-            with db_init_connect() as conn:
-                with open(DB_TABLES, "r", encoding="utf-8") as file:
-                    conn.executescript(file.read())
-                log.info(colored("Database inital setup complete", "cyan"))
+        db_create()
 
-        except sqlite3.OperationalError as error:
-            log.error(error)
+    # createtables.sql is the current schema, older databases catch up here
+    with closing(sqlite3.connect(DB_PATH)) as conn:
+        migrate(conn)
+        db_incremental_vacuum(conn)
 
     log.info(colored("Database is ready", "cyan"))
 
-    # database already setup
+    # integrity, analyze and vacuum run later from app.database.maintenance
     with db_init_connect() as conn:
         conn.executescript(
             """
@@ -75,9 +97,6 @@ def db_init() -> None:
         if log.isEnabledFor(logging.DEBUG):
             display_pragma(conn)
 
-        conn.executescript(prag_optimize)
-
-    check_ghost_process()
     return None
 
 
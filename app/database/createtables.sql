@@ -1,14 +1,17 @@
+-- schema of a new database, existing ones reach it through app.database.migrations
+-- user_version is the last migration this file already includes
+
 CREATE TABLE IF NOT EXISTS chaturbate (
-streamer_name   VARCHAR(20) NOT NULL, 
-last_broadcast  DEFAULT (datetime('now','localtime')),
-follow          DATETIME DEFAULT NULL,
+streamer_name   VARCHAR(20) NOT NULL,
+last_broadcast  INTEGER DEFAULT (CAST(strftime('%s','now') AS INTEGER)),
+follow          INTEGER DEFAULT NULL,
 pid             INTEGER DEFAULT NULL,
 domain          VARCHAR(30) DEFAULT NULL,
 followers       INTEGER DEFAULT NULL,
 viewers         INTEGER DEFAULT NULL,
 most_viewers    INTEGER DEFAULT 0,
 last_capture    DATETIME DEFAULT NULL,
-block_date      DATETIME DEFAULT NULL,
+block_date      INTEGER DEFAULT NULL,
 notes           VARCHAR(25),
 recorded        INTEGER DEFAULT NULL,
 review          INTEGER DEFAULT NULL,
@@ -19,14 +22,20 @@ detail_date     DEFAULT (datetime('now','localtime')),
 PRIMARY KEY (streamer_name)
 );
 
-CREATE UNIQUE INDEX IF NOT EXISTS idx_streamer ON chaturbate (streamer_name);
+-- db_followed, db_poll_data and db_offline
+CREATE INDEX IF NOT EXISTS idx_followed
+ON chaturbate (last_broadcast, streamer_name, recorded)
+WHERE follow IS NOT NULL AND pid IS NULL AND block_date IS NULL;
 
-CREATE TABLE IF NOT EXISTS num_streamers (
-id     INTEGER PRIMARY KEY AUTOINCREMENT,
-query  DEFAULT (datetime('now','localtime')),
-type_  VARCHAR(10) DEFAULT NULL,
-num_   INTEGER NOT NULL
-);
+-- db_capture, db_validate_pid and db_all_pids
+CREATE INDEX IF NOT EXISTS idx_capturing
+ON chaturbate (pid, streamer_name, follow, recorded)
+WHERE pid IS NOT NULL;
+
+-- db_get_all
+CREATE INDEX IF NOT EXISTS idx_following
+ON chaturbate (streamer_name)
+WHERE follow IS NOT NULL;
 
 CREATE TABLE IF NOT EXISTS domains (
 id              INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -34,6 +43,71 @@ streamer_name   VARCHAR(20) NOT NULL,
 domain          VARCHAR(50) NOT NULL
 );
 
+CREATE TABLE IF NOT EXISTS sessions (
+streamer_name   VARCHAR(20) NOT NULL,
+started         INTEGER NOT NULL,
+ended           INTEGER NOT NULL,
+peak_viewers    INTEGER DEFAULT 0,
+PRIMARY KEY (streamer_name, started)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS streamer_ids (
+id              INTEGER PRIMARY KEY,
+streamer_name   VARCHAR(20) NOT NULL UNIQUE
+);
+
+-- minute = epoch // 60, hour = epoch // 3600, day = epoch // 86400
+CREATE TABLE IF NOT EXISTS stats_minute (
+minute          INTEGER NOT NULL,
+streamer_id     INTEGER NOT NULL,
+viewers         INTEGER NOT NULL,
+followers       INTEGER NOT NULL,
+PRIMARY KEY (minute, streamer_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS stats_hour (
+hour            INTEGER NOT NULL,
+streamer_id     INTEGER NOT NULL,
+viewers_avg     INTEGER NOT NULL,
+viewers_max     INTEGER NOT NULL,
+followers       INTEGER NOT NULL,
+samples         INTEGER NOT NULL,
+PRIMARY KEY (hour, streamer_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS stats_day (
+day             INTEGER NOT NULL,
+streamer_id     INTEGER NOT NULL,
+viewers_avg     INTEGER NOT NULL,
+viewers_max     INTEGER NOT NULL,
+followers       INTEGER NOT NULL,
+samples         INTEGER NOT NULL,
+PRIMARY KEY (day, streamer_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS site_minute (
+minute          INTEGER NOT NULL,
+type_           VARCHAR(10) NOT NULL,
+num_            INTEGER NOT NULL,
+PRIMARY KEY (minute, type_)
+) WITHOUT ROWID;
 
+CREATE TABLE IF NOT EXISTS site_hour (
+hour            INTEGER NOT NULL,
+type_           VARCHAR(10) NOT NULL,
+num_avg         INTEGER NOT NULL,
+num_max         INTEGER NOT NULL,
+samples         INTEGER NOT NULL,
+PRIMARY KEY (hour, type_)
+) WITHOUT ROWID;
 
+CREATE TABLE IF NOT EXISTS site_day (
+day             INTEGER NOT NULL,
+type_           VARCHAR(10) NOT NULL,
+num_avg         INTEGER NOT NULL,
+num_max         INTEGER NOT NULL,
+samples         INTEGER NOT NULL,
+PRIMARY KEY (day, type_)
+) WITHOUT ROWID;
 
+PRAGMA user_version=4;
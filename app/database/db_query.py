@@ -1,34 +1,17 @@
+import json
 import sqlite3
-from contextlib import contextmanager
 from logging import getLogger
-from datetime import date, timedelta
-from app.config.settings import get_settings
+from time import time
+from app.database.pool import get_pool
 
 
 log = getLogger(__name__)
 
 
-@contextmanager
-def connect():
-    db_path = get_settings().DB_PATH
-    with sqlite3.connect(db_path) as conn:
-        conn.executescript("PRAGMA synchronous=NORMAL;")
-
-        yield conn.cursor()
-
-
 def query_db2(sql: str | tuple, action: str = "all"):
     data = []
     try:
-        with connect() as cursor:
-            cursor.executescript(
-                """
-                PRAGMA synchronous=OFF;
-                pragma page_size = 32768;
-                PRAGMA mmap_size = 1000000000;
-                """
-            )
-
+        with get_pool().read() as cursor:
             if isinstance(sql, tuple):
                 sql_query, args = sql
                 cursor.execute(sql_query, args)
@@ -48,12 +31,6 @@ def query_db2(sql: str | tuple, action: str = "all"):
         return data
 
 
-def db_get_api_time():
-    sql = "SELECT max(query) from num_streamers"
-    result = query_db2(sql, "one")
-    return result
-
-
 def db_get_all():
     sql = "SELECT streamer_name FROM chaturbate WHERE follow IS NOT NULL"
     result = query_db2(sql, "all")
@@ -72,8 +49,16 @@ def db_cap_status(name_: str):
     return (follow, block, domain)
 
 
+def db_domain(name_: str) -> str | None:
+    sql = ("SELECT domain FROM chaturbate WHERE streamer_name=?", (name_,))
+    if not (result := query_db2(sql, "one")):
+        return None
+
+    return result[0]
+
+
 def db_long_offline():
-    value = date.today() - timedelta(days=100)
+    value = int(time()) - 100 * 86400
     sql = (
         """
         SELECT streamer_name 
@@ -96,7 +81,7 @@ def db_long_offline():
 
 
 def db_followed():
-    value = date.today() - timedelta(days=100)
+    value = int(time()) - 100 * 86400
     sql = (
         """
         SELECT streamer_name 
@@ -116,39 +101,109 @@ def db_followed():
     return data
 
 
-def db_recorded(streamers: list):
-    name_ = tuple(streamers)
-    arg = f" IN {name_}"
-    if len(streamers) < 2:
-        arg = f"='{streamers[0]}'"
+def db_poll_data():
+    value = int(time()) - 100 * 86400
+    sql = (
+        """
+        SELECT streamer_name, last_broadcast, recorded
+        FROM chaturbate
+        WHERE (last_broadcast>? or last_broadcast IS NULL)
+        AND follow IS NOT NULL AND pid IS NULL
+        AND block_date IS NULL
+        """,
+        (value,),
+    )
+    return query_db2(sql)
 
-    sql = f"""
+
+def db_open_sessions(since: int):
+    sql = (
+        """
+        SELECT streamer_name, started, ended, peak_viewers
+        FROM sessions
+        WHERE ended>=?
+        """,
+        (since,),
+    )
+    return query_db2(sql)
+
+
+def db_session_starts(since: int):
+    sql = (
+        """
+        SELECT streamer_name, started
+        FROM sessions
+        WHERE started>=?
+        """,
+        (since,),
+    )
+    return query_db2(sql)
+
+
+def names_param(streamers: list[str]) -> str:
+    # one bound json array, read back with json_each, for any number of names
+    return json.dumps(list(streamers))
+
+
+def db_recorded(streamers: list):
+    sql = (
+        """
         SELECT streamer_name, recorded
         FROM chaturbate
-        WHERE streamer_name{arg}
-        """
+        WHERE streamer_name IN (SELECT value FROM json_each(?))
+        """,
+        (names_param(streamers),),
+    )
     result = query_db2(sql)
 
     return result
 
 
 def db_follow_offline(streamers: list):
-    name_ = tuple(streamers)
-    arg = f" IN {name_}"
-    if len(streamers) < 2:
-        arg = f"='{streamers[0]}'"
-
-    sql = f"""
+    sql = (
+        """
         SELECT streamer_name, last_broadcast, recorded
         FROM chaturbate
-        WHERE streamer_name{arg}
+        WHERE streamer_name IN (SELECT value FROM json_each(?))
         ORDER BY RANDOM()
-        """
+        """,
+        (names_param(streamers),),
+    )
     result = query_db2(sql)
 
     return result
 
 
+def db_followed_in(streamers: list[str]) -> list[str]:
+    """Followed, capturable streamers among the given names"""
+    sql = (
+        """
+        SELECT streamer_name
+        FROM chaturbate
+        WHERE streamer_name IN (SELECT value FROM json_each(?))
+        AND follow IS NOT NULL AND pid IS NULL
+        AND block_date IS NULL
+        """,
+        (names_param(streamers),),
+    )
+    return [streamer_name for streamer_name, in query_db2(sql)]
+
+
+def db_priority(name_: str):
+    sql = (
+        """
+        SELECT followers, most_viewers, recorded, keep_
+        FROM chaturbate
+        WHERE streamer_name=?
+        """,
+        (name_,),
+    )
+    if not (result := query_db2(sql, "one")):
+        return (0, 0, 0, None)
+
+    return result
+
+
 def db_get_pid(name_: str):
     sql = (
         "SELECT streamer_name, pid FROM chaturbate WHERE streamer_name=?",
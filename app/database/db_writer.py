@@ -0,0 +1,164 @@
+import sqlite3
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from logging import getLogger
+from queue import Empty, Queue
+from threading import Lock, Thread
+from time import monotonic, perf_counter, strftime
+from typing import Any
+
+from termcolor import colored
+
+from app.config.settings import get_settings
+from app.database.pool import get_pool
+
+log = getLogger(__name__)
+config = get_settings()
+
+# (sql, values, executemany)
+Statement = tuple[str, list[Any] | tuple[Any, ...], bool]
+
+
+@dataclass(slots=True)
+class WriteRequest:
+    # statements applied together in one savepoint
+    statements: list[Statement]
+    future: Future[bool] = field(default_factory=Future)
+
+
+@dataclass(slots=True)
+class DbWriter:
+    """Single writer thread, queued writes are grouped into one transaction.
+
+    Each write runs in its own savepoint, a failing statement only rolls
+    back itself. Futures resolve once the whole group has committed.
+    """
+
+    window: float
+    max_batch: int = 500
+    queue: Queue[WriteRequest] = field(default_factory=Queue)
+    conn: sqlite3.Connection = field(init=False)
+    thread: Thread = field(init=False)
+    commits: int = 0
+    writes: int = 0
+    peak_depth: int = 0
+    commit_seconds: float = 0.0
+    slowest: float = 0.0
+    reported: float = field(default_factory=monotonic)
+
+    def __post_init__(self):
+        self.conn = get_pool().open(query_only=False)
+        # transactions are managed here, not by the sqlite3 module
+        self.conn.isolation_level = None
+        self.thread = Thread(target=self.run, name="db_writer", daemon=True)
+        self.thread.start()
+
+    def submit(
+        self, sql: str, values: list[Any] | tuple[Any, ...], many: bool = False
+    ) -> Future[bool]:
+        return self.submit_group([(sql, values, many)])
+
+    def submit_group(self, statements: list[Statement]) -> Future[bool]:
+        """Statements that succeed or fail together"""
+        request = WriteRequest(statements)
+        self.queue.put(request)
+        return request.future
+
+    def run(self) -> None:
+        while True:
+            batch = self.collect()
+            self.peak_depth = max(self.peak_depth, self.queue.qsize() + len(batch))
+            if batch:
+                self.commit(batch)
+            self.report()
+
+    def collect(self) -> list[WriteRequest]:
+        # wait a few ms so a burst of writes shares one commit
+        pending = [self.queue.get()]
+        deadline = monotonic() + self.window
+        while len(pending) < self.max_batch:
+            try:
+                pending.append(self.queue.get(timeout=max(0.0, deadline - monotonic())))
+            except Empty:
+                break
+
+        # a caller may cancel while queued, once running its future can't be
+        return [x for x in pending if x.future.set_running_or_notify_cancel()]
+
+    def commit(self, batch: list[WriteRequest]) -> None:
+        start_ = perf_counter()
+        results: list[tuple[WriteRequest, Exception | None]] = []
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            for request in batch:
+                results.append((request, self.apply(request)))
+            self.conn.execute("COMMIT")
+        except Exception as error:
+            # whatever went wrong fails this batch only, the thread keeps serving
+            log.error(f"DB writer batch of {len(batch)} failed: {error}")
+            self.rollback()
+            for request in batch:
+                request.future.set_exception(error)
+            return None
+
+        elapsed = perf_counter() - start_
+        self.commits += 1
+        self.writes += len(batch)
+        self.commit_seconds += elapsed
+        self.slowest = max(self.slowest, elapsed)
+
+        for request, failed in results:
+            if failed is None:
+                request.future.set_result(True)
+            else:
+                request.future.set_exception(failed)
+
+    def apply(self, request: WriteRequest) -> Exception | None:
+        self.conn.execute("SAVEPOINT write")
+        try:
+            for sql, values, many in request.statements:
+                if many:
+                    self.conn.executemany(sql, values)
+                else:
+                    self.conn.execute(sql, values)
+        except Exception as error:
+            # bad values (OverflowError, wrong types) roll back like sql errors
+            self.conn.execute("ROLLBACK TO write")
+            self.conn.execute("RELEASE write")
+            return error
+        self.conn.execute("RELEASE write")
+        return None
+
+    def rollback(self) -> None:
+        try:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+        except sqlite3.Error as error:
+            log.error(f"DB writer rollback: {error}")
+
+    def report(self) -> None:
+        if monotonic() - self.reported < 60 or not self.commits:
+            return None
+
+        log.debug(
+            f"{strftime("%H:%M:%S")}: DB writer {self.writes} writes in {self.commits} commits, "
+            f"avg {colored(round(self.commit_seconds / self.commits * 1000, 2), "green")}ms, "
+            f"max {round(self.slowest * 1000, 2)}ms, queue depth {self.queue.qsize()} (peak {self.peak_depth})"
+        )
+        self.reported = monotonic()
+        self.commits = self.writes = self.peak_depth = 0
+        self.commit_seconds = self.slowest = 0.0
+
+
+_writer: DbWriter | None = None
+_writer_lock = Lock()
+
+
+def get_writer() -> DbWriter:
+    # one writer thread per process, even when first used from two threads at once
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = DbWriter(config.db_write_window_ms / 1000)
+    return _writer
@@ -1,14 +1,14 @@
 import logging
 import sqlite3
-from contextlib import contextmanager
-from datetime import date, datetime
-from time import strftime
+from concurrent.futures import Future
+from datetime import datetime
+from time import strftime, time
 
 from termcolor import colored
 
 from app.config.settings import get_settings
 from app.database.db_query import db_cap_status
-from app.utils.general_utils import display_pragma
+from app.database.db_writer import get_writer
 from app.utils.named_tuples import DbFollowBlock, StreamerWithPid
 
 log = logging.getLogger(__name__)
@@ -18,46 +18,28 @@ log.setLevel(logging.INFO)
 config = get_settings()
 
 
-@contextmanager
-def connect():
-    db_path = get_settings().DB_PATH
-    with sqlite3.connect(db_path) as conn:
-        conn.executescript(
-            """
-                PRAGMA cache_size=-5000;
-                PRAGMA mmap_size = 300000000;
-                PRAGMA temp_store = MEMORY;
-                PRAGMA wal_autocheckpoint=500;
-                PRAGMA page_size=5120;
-                PRAGMA synchronous=OFF;
-                """
-        )
-        if log.isEnabledFor(logging.DEBUG):
-            display_pragma(conn)
-
-        yield conn.cursor()
+def _db_submit(sql: str, values, many: bool = False) -> Future[bool]:
+    # resolves once the writer thread has committed the group holding this write
+    return get_writer().submit(sql, values, many)
 
 
 def _db_executemany(sql: str, values: list):
-    write = None
     try:
-        with connect() as cursor:
-            if isinstance(values, list):
-                write = cursor.executemany(sql, values)
-            if not isinstance(values, list):
-                write = cursor.execute(sql, values)
-        return bool(write)
+        return _db_submit(sql, values, isinstance(values, list)).result(
+            timeout=config.db_write_timeout
+        )
+    except TimeoutError:
+        log.error(colored(f"DB write timed out: {sql.split()[0]}", "red"))
     except sqlite3.Error as error:
         print(error)
         log.error(error)
 
 
 def _db_execute(sql: str, values):
-    write = None
     try:
-        with connect() as cursor:
-            write = cursor.execute(sql, values)
-        return bool(write)
+        return _db_submit(sql, values).result(timeout=config.db_write_timeout)
+    except TimeoutError:
+        log.error(colored(f"DB write timed out: {sql.split()[0]}", "red"))
     except sqlite3.Error as error:
         print(error)
         log.error(error)
@@ -75,7 +57,7 @@ def db_update_last_broadcast(values: list):
 
 def db_update_pid(arg: StreamerWithPid):
     sql = "Update chaturbate SET recorded=recorded+1, pid=?, last_capture=?, last_broadcast=? WHERE streamer_name=?"
-    args = (arg.pid, config.datetime, config.datetime, arg.streamer_name)
+    args = (arg.pid, config.datetime, int(time()), arg.streamer_name)
     if not _db_execute(sql, args):
         log.error(f"Failed to update {colored(arg.streamer_name, "red")}'s pid")
         return
@@ -89,6 +71,17 @@ def db_remove_pid(value: int):
     _db_execute(sql, (None, value))
 
 
+def db_clear_pid(name_: str):
+    sql = "UPDATE chaturbate SET pid=? WHERE streamer_name=?"
+    _db_execute(sql, (None, name_))
+
+
+def db_update_storage(name_: str, storage: str):
+    sql = "UPDATE chaturbate SET storage=? WHERE streamer_name=?"
+    if not _db_execute(sql, (storage, name_)):
+        log.error(f"Failed to update {colored(name_, "red")}'s storage")
+
+
 def db_add_domain(name_: str, domain: str):
     sql = "INSERT INTO domains (streamer_name, domain) VALUES (?, ?)"
     args = (name_, domain)
@@ -99,17 +92,17 @@ def db_add_domain(name_: str, domain: str):
 
 def db_add_streamer(name_: str, domain: str | None) -> tuple:
     today = datetime.now().replace(microsecond=0)
-    sql = f"""
+    sql = """
         INSERT INTO chaturbate (streamer_name, follow, detail_date, domain) 
         VALUES (?, ?, ?, ?) 
         ON CONFLICT (streamer_name) 
         DO UPDATE SET 
-        detail_date=IFNULL(detail_date, '{today}'),
-        follow='{today}',
+        detail_date=IFNULL(detail_date, EXCLUDED.detail_date),
+        follow=EXCLUDED.follow,
         domain=EXCLUDED.domain
         WHERE follow IS NULL
         """
-    args = (name_, today, today, domain)
+    args = (name_, int(time()), str(today), domain)
     write = _db_execute(sql, args)
     query = db_cap_status(name_)
 
@@ -120,8 +113,12 @@ def db_add_streamer(name_: str, domain: str | None) -> tuple:
 
 
 def db_num_online(type_: str, data: int):
-    sql = "INSERT INTO num_streamers (type_, num_) VALUES (?, ?)"
+    sql = """
+        INSERT INTO site_minute (minute, type_, num_) VALUES (?, ?, ?)
+        ON CONFLICT (minute, type_) DO UPDATE SET num_=MAX(num_, EXCLUDED.num_)
+        """
     args = (
+        int(time()) // 60,
         type_,
         data,
     )
@@ -154,12 +151,18 @@ def block_capture(data):
         SET block_date=?, follow=?, notes=IFNULL(notes, '')||?
         WHERE streamer_name=?
         """
-    arg = (date.today(), None, f"{reason}", name_)
+    arg = (int(time()), None, f"{reason}", name_)
     if not _db_execute(sql, arg):
         log.error(colored("Block command failed", "red"))
 
 
-def db_update_streamers(values: list):
+def db_refresh_broadcast(names: list[str]) -> Future[bool]:
+    # rooms on roomlist pages skipped as unchanged are still broadcasting
+    sql = "UPDATE chaturbate SET last_broadcast=CAST(strftime('%s', 'now') AS INTEGER) WHERE streamer_name=?"
+    return _db_submit(sql, [(x,) for x in names], True)
+
+
+def db_update_streamers(values: list) -> Future[bool]:
     sql = """
         INSERT INTO chaturbate (streamer_name, followers, viewers) 
         VALUES ( ?, ?, ?)
@@ -167,8 +170,148 @@ def db_update_streamers(values: list):
         DO UPDATE SET 
         followers=EXCLUDED.followers,
         viewers=EXCLUDED.viewers, 
-        last_broadcast=DATETIME('now', 'localtime'),
+        last_broadcast=CAST(strftime('%s', 'now') AS INTEGER),
         detail_date=DATETIME('now', 'localtime'),
         most_viewers=MAX(most_viewers, EXCLUDED.viewers)
         """
+    # append only minute rows keyed by a compact streamer id
+    ids = "INSERT OR IGNORE INTO streamer_ids (streamer_name) VALUES (?)"
+    series = """
+        INSERT INTO stats_minute (minute, streamer_id, viewers, followers)
+        SELECT ?, id, ?, ? FROM streamer_ids WHERE streamer_name=?
+        ON CONFLICT (minute, streamer_id) DO UPDATE SET
+        viewers=MAX(viewers, EXCLUDED.viewers),
+        followers=EXCLUDED.followers
+        """
+    minute = int(time()) // 60
+    return get_writer().submit_group(
+        [
+            (sql, values, True),
+            (ids, [(x[0],) for x in values], True),
+            (series, [(minute, x[2] or 0, x[1] or 0, x[0]) for x in values], True),
+        ]
+    )
+
+
+def db_upsert_sessions(values: list[tuple[str, int, int, int]]):
+    sql = """
+        INSERT INTO sessions (streamer_name, started, ended, peak_viewers)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (streamer_name, started)
+        DO UPDATE SET
+        ended=MAX(ended, EXCLUDED.ended),
+        peak_viewers=MAX(peak_viewers, EXCLUDED.peak_viewers)
+        """
     _db_executemany(sql, values)
+
+
+def db_rollup_stats(now: int) -> Future[bool]:
+    """Downsample minute rows to hours and hours to days, then apply retention.
+
+    Each pass restarts at the newest stored bucket, so reruns are idempotent
+    and only the current, still open bucket is left for the next run.
+    """
+    hour, day = now // 3600, now // 86400
+    rollups = [
+        (
+            """
+            INSERT INTO stats_hour
+            SELECT minute / 60, streamer_id, CAST(AVG(viewers) AS INTEGER),
+            MAX(viewers), MAX(followers), COUNT(*)
+            FROM stats_minute
+            WHERE minute >= IFNULL((SELECT MAX(hour) FROM stats_hour), 0) * 60
+            AND minute < ? * 60
+            GROUP BY minute / 60, streamer_id
+            ON CONFLICT (hour, streamer_id) DO UPDATE SET
+            viewers_avg=EXCLUDED.viewers_avg, viewers_max=EXCLUDED.viewers_max,
+            followers=EXCLUDED.followers, samples=EXCLUDED.samples
+            """,
+            (hour,),
+        ),
+        (
+            """
+            INSERT INTO stats_day
+            SELECT hour / 24, streamer_id,
+            CAST(SUM(viewers_avg * samples) / SUM(samples) AS INTEGER),
+            MAX(viewers_max), MAX(followers), SUM(samples)
+            FROM stats_hour
+            WHERE hour >= IFNULL((SELECT MAX(day) FROM stats_day), 0) * 24
+            AND hour < ? * 24
+            GROUP BY hour / 24, streamer_id
+            ON CONFLICT (day, streamer_id) DO UPDATE SET
+            viewers_avg=EXCLUDED.viewers_avg, viewers_max=EXCLUDED.viewers_max,
+            followers=EXCLUDED.followers, samples=EXCLUDED.samples
+            """,
+            (day,),
+        ),
+        (
+            """
+            INSERT INTO site_hour
+            SELECT minute / 60, type_, CAST(AVG(num_) AS INTEGER), MAX(num_), COUNT(*)
+            FROM site_minute
+            WHERE minute >= IFNULL((SELECT MAX(hour) FROM site_hour), 0) * 60
+            AND minute < ? * 60
+            GROUP BY minute / 60, type_
+            ON CONFLICT (hour, type_) DO UPDATE SET
+            num_avg=EXCLUDED.num_avg, num_max=EXCLUDED.num_max, samples=EXCLUDED.samples
+            """,
+            (hour,),
+        ),
+        (
+            """
+            INSERT INTO site_day
+            SELECT hour / 24, type_,
+            CAST(SUM(num_avg * samples) / SUM(samples) AS INTEGER),
+            MAX(num_max), SUM(samples)
+            FROM site_hour
+            WHERE hour >= IFNULL((SELECT MAX(day) FROM site_day), 0) * 24
+            AND hour < ? * 24
+            GROUP BY hour / 24, type_
+            ON CONFLICT (day, type_) DO UPDATE SET
+            num_avg=EXCLUDED.num_avg, num_max=EXCLUDED.num_max, samples=EXCLUDED.samples
+            """,
+            (day,),
+        ),
+    ]
+
+    # retention, a tier is only trimmed below the newest bucket the next tier
+    # holds, that bucket itself is rebuilt by the next pass
+    minutes = now // 60 - config.stats_minute_days * 1440
+    hours = hour - config.stats_hour_days * 24
+    days = day - config.stats_day_days
+    retention = [
+        (
+            """
+            DELETE FROM stats_minute WHERE minute
+            < MIN(?, IFNULL((SELECT MAX(hour) FROM stats_hour), 0) * 60)
+            """,
+            (minutes,),
+        ),
+        (
+            """
+            DELETE FROM site_minute WHERE minute
+            < MIN(?, IFNULL((SELECT MAX(hour) FROM site_hour), 0) * 60)
+            """,
+            (minutes,),
+        ),
+        (
+            """
+            DELETE FROM stats_hour WHERE hour
+            < MIN(?, IFNULL((SELECT MAX(day) FROM stats_day), 0) * 24)
+            """,
+            (hours,),
+        ),
+        (
+            """
+            DELETE FROM site_hour WHERE hour
+            < MIN(?, IFNULL((SELECT MAX(day) FROM site_day), 0) * 24)
+            """,
+            (hours,),
+        ),
+        ("DELETE FROM stats_day WHERE day < ?", (days,)),
+        ("DELETE FROM site_day WHERE day < ?", (days,)),
+    ]
+
+    return get_writer().submit_group(
+        [(sql, args, False) for sql, args in rollups + retention]
+    )
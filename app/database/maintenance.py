@@ -0,0 +1,130 @@
+import sqlite3
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from functools import lru_cache
+from logging import getLogger
+from pathlib import Path
+from threading import Thread
+from time import monotonic, perf_counter, sleep, strftime, time
+
+from termcolor import colored
+
+from app.config.settings import get_settings
+from app.database.db_writes import db_rollup_stats
+
+log = getLogger(__name__)
+config = get_settings()
+
+DB_PATH = config.DB_PATH
+WAL_PATH = Path(f"{DB_PATH}-wal")
+
+
+def db_idle(seconds: float) -> bool:
+    # every commit touches the wal, its mtime is the last write time
+    try:
+        return time() - WAL_PATH.stat().st_mtime >= seconds
+    except FileNotFoundError:
+        return True
+
+
+def checkpoint(conn: sqlite3.Connection) -> None:
+    # truncate only when idle so readers and writers are never blocked
+    busy, *_ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    if busy:
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+
+def optimize(conn: sqlite3.Connection) -> None:
+    conn.execute("PRAGMA optimize")
+
+
+def incremental_vacuum(conn: sqlite3.Connection) -> None:
+    # never a full VACUUM on the live database, db_init converts older ones
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return None
+
+    # each step frees one page, the pragma only runs to the end when fetched
+    conn.execute(f"PRAGMA incremental_vacuum({config.vacuum_pages})").fetchall()
+
+
+def rollup(_conn: sqlite3.Connection) -> None:
+    # the statements go through the db writer, queued behind live writes
+    # instead of contending with them, this thread only waits for the commit
+    db_rollup_stats(int(time())).result()
+
+
+def integrity(conn: sqlite3.Connection) -> None:
+    if (result := conn.execute("PRAGMA integrity_check").fetchone()[0]) != "ok":
+        log.error(colored(f"Database integrity check: {result}", "red"))
+    conn.execute("ANALYZE")
+
+
+@dataclass(slots=True)
+class Job:
+    name: str
+    run: Callable[[sqlite3.Connection], None]
+    interval: float
+    last: float = field(default_factory=monotonic)
+
+    def due(self, now: float) -> bool:
+        return now - self.last >= self.interval
+
+
+@dataclass(slots=True)
+class DbMaintenance:
+    """Housekeeping that used to run in db_init, now done while the db is idle"""
+
+    jobs: list[Job] = field(default_factory=list)
+    thread: Thread = field(init=False)
+
+    def __post_init__(self):
+        self.jobs = [
+            Job("checkpoint", checkpoint, 60),
+            Job("optimize", optimize, config.maintenance_interval),
+            Job("stats_rollup", rollup, config.maintenance_interval),
+            Job("incremental_vacuum", incremental_vacuum, config.maintenance_interval),
+            # first integrity check a few minutes after startup, then daily
+            Job(
+                "integrity",
+                integrity,
+                config.integrity_interval,
+                monotonic() - config.integrity_interval + 300,
+            ),
+        ]
+        self.thread = Thread(target=self.run, name="db_maintenance", daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        while True:
+            sleep(30)
+            now = monotonic()
+            if not (due := [x for x in self.jobs if x.due(now)]):
+                continue
+            if not db_idle(config.maintenance_idle_seconds):
+                continue
+
+            conn = sqlite3.connect(DB_PATH, timeout=30)
+            try:
+                for job in due:
+                    self.run_job(conn, job)
+            finally:
+                conn.close()
+
+    def run_job(self, conn: sqlite3.Connection, job: Job) -> None:
+        start_ = perf_counter()
+        try:
+            job.run(conn)
+        except sqlite3.Error as error:
+            # a failed job is retried next interval, the thread keeps running
+            log.error(colored(f"{job.name}: {type(error).__name__}: {error}", "red"))
+        finally:
+            job.last = monotonic()
+
+        log.debug(
+            f"{strftime("%H:%M:%S")}: {job.name} took {colored(round(perf_counter() - start_, 3), "green")} seconds"
+        )
+
+
+@lru_cache()
+def get_maintenance() -> DbMaintenance:
+    return DbMaintenance()
@@ -0,0 +1,218 @@
+import sqlite3
+from logging import getLogger
+from time import perf_counter
+
+from termcolor import colored
+
+from app.utils.named_tuples import Migration
+
+log = getLogger(__name__)
+
+EPOCH_NOW = "CAST(strftime('%s','now') AS INTEGER)"
+
+
+def to_epoch(column: str) -> str:
+    # stored text is localtime, the 'utc' modifier shifts it before %s,
+    # an unparsable value keeps its set/unset meaning as the migration time
+    return (
+        f"COALESCE(CAST(strftime('%s', {column}, 'utc') AS INTEGER), "
+        f"CASE WHEN {column} IS NOT NULL THEN {EPOCH_NOW} END)"
+    )
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(
+        1,
+        "session history",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+            streamer_name   VARCHAR(20) NOT NULL,
+            started         INTEGER NOT NULL,
+            ended           INTEGER NOT NULL,
+            peak_viewers    INTEGER DEFAULT 0,
+            PRIMARY KEY (streamer_name, started)
+            ) WITHOUT ROWID
+            """,
+        ],
+    ),
+    Migration(
+        2,
+        "epoch columns for last_broadcast, follow and block_date",
+        [
+            f"""
+            CREATE TABLE chaturbate_new (
+            streamer_name   VARCHAR(20) NOT NULL,
+            last_broadcast  INTEGER DEFAULT ({EPOCH_NOW}),
+            follow          INTEGER DEFAULT NULL,
+            pid             INTEGER DEFAULT NULL,
+            domain          VARCHAR(30) DEFAULT NULL,
+            followers       INTEGER DEFAULT NULL,
+            viewers         INTEGER DEFAULT NULL,
+            most_viewers    INTEGER DEFAULT 0,
+            last_capture    DATETIME DEFAULT NULL,
+            block_date      INTEGER DEFAULT NULL,
+            notes           VARCHAR(25),
+            recorded        INTEGER DEFAULT NULL,
+            review          INTEGER DEFAULT NULL,
+            keep_           INTEGER DEFAULT NULL,
+            storage         VARCHAR(12),
+            created_on      DEFAULT (date('now','localtime')),
+            detail_date     DEFAULT (datetime('now','localtime')),
+            PRIMARY KEY (streamer_name)
+            )
+            """,
+            f"""
+            INSERT INTO chaturbate_new
+            SELECT streamer_name, {to_epoch("last_broadcast")}, {to_epoch("follow")},
+            pid, domain, followers, viewers, most_viewers, last_capture,
+            {to_epoch("block_date")}, notes, recorded, review, keep_, storage,
+            created_on, detail_date
+            FROM chaturbate
+            """,
+            "DROP TABLE chaturbate",
+            "ALTER TABLE chaturbate_new RENAME TO chaturbate",
+        ],
+    ),
+    Migration(
+        3,
+        "partial and covering indexes for the hot queries",
+        [
+            # the primary key already has a unique index
+            "DROP INDEX IF EXISTS idx_streamer",
+            # db_followed, db_poll_data and db_offline
+            """
+            CREATE INDEX IF NOT EXISTS idx_followed
+            ON chaturbate (last_broadcast, streamer_name, recorded)
+            WHERE follow IS NOT NULL AND pid IS NULL AND block_date IS NULL
+            """,
+            # db_capture, db_validate_pid and db_all_pids
+            """
+            CREATE INDEX IF NOT EXISTS idx_capturing
+            ON chaturbate (pid, streamer_name, follow, recorded)
+            WHERE pid IS NOT NULL
+            """,
+            # db_get_all
+            """
+            CREATE INDEX IF NOT EXISTS idx_following
+            ON chaturbate (streamer_name)
+            WHERE follow IS NOT NULL
+            """,
+            "ANALYZE chaturbate",
+        ],
+    ),
+    Migration(
+        4,
+        "time series for streamer stats and site totals",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS streamer_ids (
+            id              INTEGER PRIMARY KEY,
+            streamer_name   VARCHAR(20) NOT NULL UNIQUE
+            )
+            """,
+            # minute = epoch // 60, hour = epoch // 3600, day = epoch // 86400
+            """
+            CREATE TABLE IF NOT EXISTS stats_minute (
+            minute          INTEGER NOT NULL,
+            streamer_id     INTEGER NOT NULL,
+            viewers         INTEGER NOT NULL,
+            followers       INTEGER NOT NULL,
+            PRIMARY KEY (minute, streamer_id)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS stats_hour (
+            hour            INTEGER NOT NULL,
+            streamer_id     INTEGER NOT NULL,
+            viewers_avg     INTEGER NOT NULL,
+            viewers_max     INTEGER NOT NULL,
+            followers       INTEGER NOT NULL,
+            samples         INTEGER NOT NULL,
+            PRIMARY KEY (hour, streamer_id)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS stats_day (
+            day             INTEGER NOT NULL,
+            streamer_id     INTEGER NOT NULL,
+            viewers_avg     INTEGER NOT NULL,
+            viewers_max     INTEGER NOT NULL,
+            followers       INTEGER NOT NULL,
+            samples         INTEGER NOT NULL,
+            PRIMARY KEY (day, streamer_id)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS site_minute (
+            minute          INTEGER NOT NULL,
+            type_           VARCHAR(10) NOT NULL,
+            num_            INTEGER NOT NULL,
+            PRIMARY KEY (minute, type_)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS site_hour (
+            hour            INTEGER NOT NULL,
+            type_           VARCHAR(10) NOT NULL,
+            num_avg         INTEGER NOT NULL,
+            num_max         INTEGER NOT NULL,
+            samples         INTEGER NOT NULL,
+            PRIMARY KEY (hour, type_)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS site_day (
+            day             INTEGER NOT NULL,
+            type_           VARCHAR(10) NOT NULL,
+            num_avg         INTEGER NOT NULL,
+            num_max         INTEGER NOT NULL,
+            samples         INTEGER NOT NULL,
+            PRIMARY KEY (day, type_)
+            ) WITHOUT ROWID
+            """,
+            # num_streamers history moves into the minute series, rollups take it from there
+            f"""
+            INSERT OR REPLACE INTO site_minute (minute, type_, num_)
+            SELECT {to_epoch("query")} / 60 AS minute, IFNULL(type_, 'total'), MAX(num_)
+            FROM num_streamers
+            WHERE query IS NOT NULL
+            GROUP BY 1, 2
+            """,
+            "DROP TABLE IF EXISTS num_streamers",
+        ],
+    ),
+]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations in order, PRAGMA user_version holds the last one"""
+    conn.isolation_level = None
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+
+        start_ = perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in migration.statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version={migration.version}")
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            log.error(colored(f"Migration {migration.version} failed", "red"))
+            raise
+
+        version = migration.version
+        log.info(
+            colored(
+                f"Database migration {version}: {migration.name} ({round(perf_counter() - start_, 3)}s)",
+                "cyan",
+            )
+        )
+
+    return version
+
@@ -0,0 +1,77 @@
+import logging
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from threading import Lock, local
+
+from app.config.settings import get_settings
+from app.utils.general_utils import display_pragma
+
+log = logging.getLogger(__name__)
+config = get_settings()
+
+# applied once when a connection opens, not on every query
+PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-8000;
+    PRAGMA mmap_size=268435456;
+    PRAGMA busy_timeout=5000;
+    """
+
+
+@dataclass(slots=True)
+class ConnectionPool:
+    """One read connection per thread, writes go through app.database.db_writer.
+
+    Connections live for the life of the app, so sqlite3's per connection
+    statement cache keeps every query prepared after its first use.
+    """
+
+    path: Path
+    cached_statements: int = 256
+    readers: local = field(default_factory=local)
+    opened: list[sqlite3.Connection] = field(default_factory=list)
+    lock: Lock = field(default_factory=Lock)
+
+    def open(self, query_only: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=5,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.executescript(PRAGMAS)
+        if query_only:
+            conn.execute("PRAGMA query_only=1")
+        if log.isEnabledFor(logging.DEBUG):
+            display_pragma(conn)
+
+        with self.lock:
+            self.opened.append(conn)
+        return conn
+
+    @contextmanager
+    def read(self):
+        if (conn := getattr(self.readers, "conn", None)) is None:
+            conn = self.readers.conn = self.open(query_only=True)
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    def close(self) -> None:
+        with self.lock:
+            opened, self.opened = self.opened, []
+        for conn in opened:
+            conn.close()
+        self.readers = local()
+
+
+@lru_cache()
+def get_pool() -> ConnectionPool:
+    return ConnectionPool(config.DB_PATH)
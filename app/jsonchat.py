@@ -1,107 +1,169 @@
 import asyncio
-import math
+from concurrent.futures import Future
 from datetime import timedelta
+from functools import partial
 from logging import getLogger
-from random import choice, shuffle, uniform
-from string import ascii_lowercase
+from random import shuffle, uniform
 from time import perf_counter, strftime
 
-import pandas as pd
 from httpx import AsyncClient
 from termcolor import colored
 
-from app.database.db_writes import db_num_online, db_update_streamers
-from app.utils.constants import HEADERS_JSON
+from app.config.settings import get_settings
+from app.database.db_writes import (
+    db_num_online,
+    db_refresh_broadcast,
+    db_update_streamers,
+)
+from app.utils.batch_requests import BatchReport, attempt
+from app.utils.http_clients import get_client
+from app.utils.online_index import get_online_index
+from app.utils.roomlist_pages import get_roomlist_pages
+from app.utils.session_history import get_session_history
 
 log = getLogger(__name__)
+config = get_settings()
 
+# pages of (streamer_name, followers, viewers), None ends the stream
+RowQueue = asyncio.Queue[list[tuple[str, int, int]] | None]
 
-def random_id(length) -> str:
-    letters = ascii_lowercase
-    return "".join(choice(letters) for _ in range(length)) + "a9a9ab8b8"
 
+async def get_data(client: AsyncClient, url) -> list[tuple[str, int, int]] | None:
+    response = await client.get(url, timeout=25)
 
-def remove_duplicates(list_):
-    return list(set([i for i in list_]))
+    if response.status_code != 200:
+        # 429 backoff is handled by the host rate limiter
+        log.error(f"code: {response.status_code}, func: get_data")
+        return None
 
+    # parse once, pull the three columns straight from each room
+    # zero rooms means the url offset doesn't exist
+    rows = [
+        (room["username"], room["num_followers"], room["num_users"])
+        for room in response.json().get("rooms", [])
+    ]
 
-async def get_data(client: AsyncClient, url):
-    data_columns: list = []
+    get_online_index().add_page(x[0] for x in rows)
+    return rows
 
-    response = await client.get(url, timeout=25)
 
-    if response.status_code != 200:
-        log.error(f"code: {response.status_code}, func: get_data")
+def url_offset(url: str) -> int:
+    return int(url.rsplit("=", 1)[1])
 
-        await asyncio.sleep(17)
-        return [[random_id(10), 0, 0]]
 
-    # Zero length element means url offset doesn't exist
-    if len(response.json()["rooms"]) < 1:
-        return [[random_id(10), 0, 0]]
+async def fetch_page(
+    client: AsyncClient, url: str, queue: RowQueue, report: BatchReport
+) -> None:
+    pages = get_roomlist_pages()
+    offset = url_offset(url)
+    if pages.past_end(offset):
+        return None
 
-    data_frame = pd.json_normalize(response.json(), "rooms")
+    rows = await attempt(partial(get_data, client, url), None, report)
+    pages.record(offset, rows)
+    if rows is None:
+        report.errors[offset] = "no data"
+        return None
 
-    data_columns.append(
-        data_frame[["username", "num_followers", "num_users"]].values.tolist()
-    )
+    report.completed += 1
+    get_session_history().observe((x[0], x[2]) for x in rows)
+    if rows:
+        await queue.put(rows)
 
-    data_brackets = sum(list(data_columns), [])
-    return data_brackets
 
+async def fetch_pages(
+    client: AsyncClient, urls: list[str], queue: RowQueue
+) -> BatchReport:
+    # a few workers share the url list, generate_urls puts the tail page first
+    # so a short or empty tail sets the end before most offsets are requested
+    pending = iter(urls)
+    report = BatchReport()
 
-async def process_urls(i: int, num_batches: int, urls: list[str]) -> None:
-    start_ = perf_counter()
+    async def worker() -> None:
+        for url in pending:
+            try:
+                await fetch_page(client, url, queue, report)
+            except Exception as error:
+                report.failed(url_offset(url), error)
 
-    async with AsyncClient(headers=HEADERS_JSON, http2=True) as client:
-        async with asyncio.TaskGroup() as group:
-            results = []
-            for url in urls:
-                task = group.create_task(get_data(client, url))
-                task.add_done_callback(lambda t: results.append(t.result()))
+    async with asyncio.TaskGroup() as group:
+        for _ in range(config.scrape_workers):
+            group.create_task(worker())
 
-    remove_next = sum(list(results), [])
-    list_to_tuple = [tuple(elem) for elem in remove_next]
+    return report
 
-    undupe = remove_duplicates(list_to_tuple)
 
-    log.debug(
-        f"Processed {colored(len(list_to_tuple),"green")} streamers in: {colored(round(perf_counter() - start_,4), 'green')} seconds"
-    )
+async def write_batch(batch: list[tuple[str, int, int]]) -> None:
+    await wait_write(db_update_streamers(batch))
+
+
+async def wait_write(future: Future[bool]) -> None:
+    try:
+        await asyncio.wrap_future(future)
+    except Exception as error:
+        # the writer hands back whatever failed the batch, not only sqlite errors
+        log.error(error)
+
 
-    # write to database
-    db_num_online("batch", len(undupe))
-    db_update_streamers(undupe)
+async def write_rows(queue: RowQueue) -> int:
+    # rooms shift between pages while a scrape runs, keep the first sighting
+    seen: set[str] = set()
+    batch: list[tuple[str, int, int]] = []
 
-    # delay to minimize triggering rate limit
-    # sleep time can be adjusted up / down til limit (response code:429 occurs)
-    # error on the side of caution when using a short delay.
-    delay_ = uniform(109.05, 150.78)
+    while (rows := await queue.get()) is not None:
+        for row in rows:
+            if row[0] in seen:
+                continue
+            seen.add(row[0])
+            batch.append(row)
 
-    if num_batches > 2:
-        delay_ = uniform(62.05, 120.78)
+        if len(batch) >= config.ingest_batch_size:
+            await write_batch(batch)
+            batch = []
+
+    if batch:
+        await write_batch(batch)
+
+    return len(seen)
+
+
+async def process_urls(urls: list[str]) -> None:
+    start_ = perf_counter()
+
+    # pages stream through a bounded queue into batched upserts
+    client = get_client("json")
+    queue: RowQueue = asyncio.Queue(maxsize=config.ingest_queue_size)
+    writer = asyncio.create_task(write_rows(queue))
+
+    try:
+        report = await fetch_pages(client, urls, queue)
+    finally:
+        await queue.put(None)
+
+    processed = await writer
 
-    _, minutes, seconds = str(timedelta(seconds=delay_)).split(":")
-    seconds = round(float(seconds))
     log.debug(
-        f"{strftime("%H:%M:%S")}: Next JSON batch process: {minutes}min {seconds}sec"
+        f"Processed {colored(processed,"green")} streamers in: {colored(round(perf_counter() - start_,4), 'green')} seconds"
     )
-    if i < (num_batches - 1):
-        await asyncio.sleep(delay_)
+    report.log_errors(log, "Roomlist offset")
+    if report.errors:
+        log.info(f"{strftime("%H:%M:%S")}: Roomlist pages: {report.summary()}")
+
+    db_num_online("batch", processed)
 
     return None
 
 
 async def get_num_online(base_url: str) -> int:
     offset = base_url + "0"
-    async with AsyncClient(headers=HEADERS_JSON, http2=True) as client:
-        response = await client.get(offset)
-        if response.status_code != 200:
-            log.error(colored(f"-{response.status_code}", "red"))
-            return 0
+    client = get_client("json")
+    response = await client.get(offset)
+    if response.status_code != 200:
+        log.error(colored(f"-{response.status_code}", "red"))
+        return 0
 
-        #   cookie = response.cookies
-        streamers_online: int = response.json()["total_count"]
+    #   cookie = response.cookies
+    streamers_online: int = response.json()["total_count"]
 
     # save to database
     db_num_online("total", streamers_online)
@@ -126,24 +188,6 @@ def generate_urls(base_url: str, streamers_online: int) -> list[str]:
     return json_urls
 
 
-def url_grouping(json_urls: list[str]) -> list[list[str]]:
-    # minimize chance for response code 429.
-    rate_limit = 54
-    count_urls = len(json_urls)
-
-    if count_urls in range(55, 70):
-        rate_limit = math.floor(len(json_urls) / 2)
-
-    if count_urls in range(71, 86):
-        rate_limit = math.floor(len(json_urls) / 2.5)
-
-    url_groups = [
-        json_urls[x : x + rate_limit] for x in range(1, len(json_urls), rate_limit)
-    ]
-
-    return url_groups
-
-
 async def json_scraping() -> None:
     # data_columns: list = []
     base_url = (
@@ -155,12 +199,29 @@ async def json_scraping() -> None:
         f"{strftime("%H:%M:%S")}: {colored(streamers_online,"green")} streamers online"
     )
 
+    # requests are paced by the shared chaturbate.com rate limiter
     json_urls = generate_urls(base_url, streamers_online)
-    url_groups = url_grouping(json_urls)
-
-    num_batches = len(url_groups)
+    pages = get_roomlist_pages()
+    pages.start_cycle()
+    if not config.incremental_scrape:
+        await process_urls(json_urls)
+        return None
+
+    # the tail page is always fetched, it sets where this cycle's list ends
+    tail, *rest = json_urls
+    due = [tail, *(x for x in rest if pages.due(url_offset(x)))]
+    await process_urls(due)
+
+    # skipped pages are unchanged, their rooms are still live
+    fetched = set(due)
+    skipped = [url_offset(x) for x in rest if x not in fetched]
+    if rooms := pages.cached(skipped):
+        get_session_history().observe((x, None) for x in rooms)
+        await wait_write(db_refresh_broadcast(sorted(rooms)))
 
-    _=[await process_urls(i, num_batches, batch) for i, batch in enumerate(url_groups)]
+    log.info(
+        f"{strftime("%H:%M:%S")}: Roomlist fetched {colored(pages.fetched, "green")} of {len(json_urls)} pages, {pages.changed} changed"
+    )
 
     return None
 
@@ -175,6 +236,7 @@ async def query_streamers():
     while True:
         start = perf_counter()
         await json_scraping()
+        get_online_index().prune()
 
         log.debug(
             f"{strftime("%H:%M:%S")}: Processed JSONs in: {colored(round((perf_counter() - start), 3), "green")} seconds"
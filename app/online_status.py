@@ -1,20 +1,42 @@
 import asyncio
+import math
 from collections.abc import Iterable
-from datetime import timedelta
+from dataclasses import dataclass, field
+from functools import partial
 from logging import getLogger
-from random import uniform
-from time import perf_counter, strftime
+from time import monotonic, perf_counter, strftime, time
 from httpx import AsyncClient
 from tabulate import tabulate
 from termcolor import colored
-from app.database.db_query import db_follow_offline, db_followed, db_recorded
+from app.config.settings import get_settings
+from app.database.db_query import (
+    db_follow_offline,
+    db_followed,
+    db_followed_in,
+    db_get_all,
+    db_open_sessions,
+    db_poll_data,
+    db_recorded,
+)
+from app.database.db_writes import db_upsert_sessions
+from app.jsonchat import exception_handler, query_streamers
 from app.sites.capture_streamer import CaptureStreamer
+from app.sites.capture_supervisor import get_supervisor
 from app.sites.create_streamer import CreateStreamer
-from app.sites.getstreamerurl import get_streamer_url
-from app.utils.constants import HEADERS_IMG
-from app.utils.general_utils import recent_api_call
+from app.sites.getstreamerurl import resolve_streamer_urls
+from app.sites.prewarm import get_prewarmer
+from app.utils.batch_requests import get_hedge, run_batch
+from app.utils.general_utils import format_epoch
+from app.utils.http_clients import get_client
+from app.utils.online_index import get_online_index
+from app.utils.poll_schedule import PollScheduler, get_poll_scheduler
+from app.utils.session_history import get_session_history
 
 log = getLogger(__name__)
+config = get_settings()
+
+# the loop only keeps weak references to tasks, these live until done
+page_tasks: set[asyncio.Task[None]] = set()
 
 
 class PrintTables:
@@ -34,33 +56,74 @@ def streamer_grouping(followed: list):
     return streamer_groups
 
 
-async def get_data(client: AsyncClient, name_: str) -> tuple[int, str]:
+@dataclass(slots=True)
+class ProbeStats:
+    probes: int = 0
+    online: int = 0
+    bytes_skipped: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+    def record(self, status_code: int, latency: float, skipped: int) -> None:
+        self.probes += 1
+        self.online += status_code == 200
+        self.bytes_skipped += skipped
+        self.latencies.append(latency)
+
+    def summary(self) -> str:
+        if not self.latencies:
+            return "no probes"
+
+        ordered = sorted(self.latencies)
+        p50 = ordered[len(ordered) // 2] * 1000
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000
+        return (
+            f"{self.probes} probes, {self.online} online, "
+            f"p50 {round(p50)}ms, p95 {round(p95)}ms, "
+            f"{round(self.bytes_skipped / 1024**2, 2)} MB of snapshots skipped"
+        )
+
+
+async def get_data(
+    client: AsyncClient, name_: str, stats: ProbeStats | None = None
+) -> tuple[int, str]:
     headers = {"path": f"/stream?room={name_}"}
+    start_ = perf_counter()
 
-    response = await client.get(
+    # the status line answers the question, the jpeg body is never read
+    async with client.stream(
+        "GET",
         f"https://jpeg.live.mmcdn.com/stream?room={name_}",
         headers=headers,
         timeout=9,
-    )
+    ) as response:
+        status_code = response.status_code
+        skipped = int(response.headers.get("content-length", 0) or 0)
 
-    return (response.status_code, name_)
+    if stats is not None:
+        stats.record(status_code, perf_counter() - start_, skipped)
+
+    return (status_code, name_)
 
 
 async def process_streamers(streamer_groups: list):
     start_ = perf_counter()
 
-    async with AsyncClient(headers=HEADERS_IMG, http2=True) as client:
-        async with asyncio.TaskGroup() as group:
-            results = []
+    client = get_client("img")
+    stats = ProbeStats()
+    names = [x for streamers in streamer_groups for x in streamers]
 
-            for _, streamers in enumerate(streamer_groups):
-                for streamer in streamers:
-                    task = group.create_task(get_data(client, streamer))
-                    task.add_done_callback(lambda t: results.append(t.result()))
+    # a failed probe leaves that streamer unknown until the next sweep
+    results, report = await run_batch(
+        names, partial(get_data, client, stats=stats), get_hedge("img")
+    )
+    report.log_errors(log, "Probe")
 
     log.debug(
         f"Status for {colored(len(results), "green")} streamer(s) in: {colored(round(perf_counter() - start_, 4), 'green')} seconds"
     )
+    log.debug(
+        f"{strftime("%H:%M:%S")}: Online probes: {stats.summary()}, {report.summary()}"
+    )
 
     return results
 
@@ -115,7 +178,10 @@ def offline_tables(offline):
         table_title = f"Status for 10 of {len(offline_streamers)} followed streamers"
         offline_streamers = offline_streamers[:10]
 
-    offline_streamers.sort(key=lambda tup: tup[1], reverse=False)
+    offline_streamers.sort(key=lambda tup: tup[1] or 0, reverse=False)
+    offline_streamers = [
+        (x, format_epoch(last), recorded) for x, last, recorded in offline_streamers
+    ]
     print(table_title)
     head = ["Streamers", "Last Seen", "# Caps"]
     print(
@@ -129,23 +195,26 @@ def offline_tables(offline):
     print()
 
 
+async def check_streamers(names: list[str]) -> tuple[list[str], list[str]]:
+    # follows seen in the latest roomlist scrape skip the probe
+    indexed, unknown = get_online_index().split(names)
+    streamer_groups = streamer_grouping(unknown)
+
+    is_online = await process_streamers(streamer_groups)
+    online, offline = sort_streamers(is_online)
+    online = indexed + online
+
+    get_session_history().observe((x, None) for x in online)
+    return (online, offline)
+
+
 async def get_online_streamers() -> None:
 
     if (followed := db_followed()) == []:
         log.info(colored("Zero streamers are designated for capture", "yellow"))
         return None
 
-    streamer_groups = streamer_grouping(followed)
-
-    if recent_api_call():
-        log.info(
-            f"{strftime("%H:%M:%S")}: {colored("Awaiting api rest online_status",'yellow')}"
-        )
-        await asyncio.sleep(90)
-        log.info(f"{strftime("%H:%M:%S")}: resuming api call")
-
-    is_online = await process_streamers(streamer_groups)
-    online, offline = sort_streamers(is_online)
+    online, offline = await check_streamers(followed)
 
     if not bool(PrintTables.has_shown):
         offline_tables(offline)
@@ -153,34 +222,106 @@ async def get_online_streamers() -> None:
 
     PrintTables.has_shown = True
 
-    if len(online) > 0:
-        streamer_data = await get_streamer_url(online)
+    await start_captures(online)
+
+    return None
+
+
+async def start_captures(online: list[str]) -> None:
+    # reserved before the url lookup, so a sweep and a roomlist page hit
+    # can't both start the same streamer, sessions and restarts are skipped
+    supervisor = get_supervisor()
+    if not (online := [x for x in online if supervisor.reserve(x)]):
+        return None
+
+    started: set[str] = set()
+    try:
+        streamer_data = await resolve_streamer_urls(online)
         cap_streamers = [CreateStreamer(*x).return_data for x in streamer_data]
 
-        _=[CaptureStreamer(x) for x in cap_streamers if isinstance(x, Iterable)]
+        captures = [CaptureStreamer(x) for x in cap_streamers if isinstance(x, Iterable)]
+        started = {x.name_ for x in captures if x.url}
+    finally:
+        # started captures drop their reservation once admitted
+        supervisor.unreserve(x for x in online if x not in started)
 
-    return None
+
+def page_done(task: asyncio.Task[None]) -> None:
+    page_tasks.discard(task)
+    if not task.cancelled() and (error := task.exception()) is not None:
+        log.error(error)
+
+
+def start_page_captures(live: list[str]) -> None:
+    task = asyncio.get_running_loop().create_task(start_captures(live))
+    page_tasks.add(task)
+    task.add_done_callback(page_done)
+
+
+def on_roomlist_page(loop: asyncio.AbstractEventLoop, page: set[str]) -> None:
+    # a followed streamer in a fresh roomlist page is captured right away
+    if not (live := db_followed_in(list(page))):
+        return None
+    loop.call_soon_threadsafe(start_page_captures, sorted(live))
+
+
+def sync_followed(scheduler: PollScheduler) -> None:
+    scheduler.sync(db_poll_data())
+
+    # active captures count as sightings, then the sessions are written out
+    supervisor = get_supervisor()
+    history = get_session_history()
+    history.watch(x for x, in db_get_all())
+    history.observe((x, None) for x in supervisor.active())
+    if rows := history.flush():
+        db_upsert_sessions(rows)
+
+    get_prewarmer().run(skip=set(supervisor.admission.sessions))
+
+
+async def poll_due(scheduler: PollScheduler) -> None:
+    if not (due := scheduler.pop_due()):
+        return None
+
+    online, _ = await check_streamers(due)
+    await start_captures(online)
 
 
 async def query_online():
+    # sightings from the startup check count too, watch before it runs
+    history = get_session_history()
+    history.load(db_open_sessions(int(time()) - history.gap))
+    history.watch(x for x, in db_get_all())
+
+    # one full check at startup for the tables, then a rolling per streamer sweep
+    start = perf_counter()
+    await get_online_streamers()
+    log.info(
+        f"{strftime("%H:%M:%S")}: Streamer check completed: {colored(round((perf_counter() - start), 4), "green")} seconds"
+    )
 
+    scheduler = get_poll_scheduler()
+    synced = -math.inf
     while True:
-        start = perf_counter()
-        await get_online_streamers()
-        log.info(
-            f"{strftime("%H:%M:%S")}: Streamer check completed: {colored(round((perf_counter() - start), 4), "green")} seconds"
-        )
+        if monotonic() - synced >= config.prewarm_every:
+            await asyncio.to_thread(sync_followed, scheduler)
+            synced = monotonic()
+            log.info(
+                f"{strftime("%H:%M:%S")}: Polling {colored(len(scheduler.intervals), "green")} followed streamers, {round(scheduler.rate() * 60, 1)} checks/min"
+            )
 
-        delay_ = uniform(290.05, 345.7)
-        _, minutes, seconds = str(timedelta(seconds=delay_)).split(":")
-        seconds = round(float(seconds))
-        log.info(f"Next streamer check: {minutes}min {seconds}sec")
-        await asyncio.sleep(delay_)
+        await poll_due(scheduler)
+        await asyncio.sleep(config.poll_tick)
 
 
 def run_online_status():
     loop = asyncio.new_event_loop()
     loop.create_task(query_online())
+
+    if config.scrape_roomlist:
+        get_online_index().subscribe(partial(on_roomlist_page, loop))
+        loop.set_exception_handler(exception_handler)
+        loop.create_task(query_streamers())
     loop.run_forever()
 
 
@@ -0,0 +1,81 @@
+from dataclasses import dataclass, field
+from math import log10
+
+from app.utils.named_tuples import Admission, StreamerData
+
+
+def priority_score(followers, most_viewers, recorded, keep_) -> float:
+    score = (
+        log10(1 + (followers or 0))
+        + log10(1 + (most_viewers or 0))
+        + 0.5 * log10(1 + (recorded or 0))
+    )
+    # streamers marked keep_ always outrank the rest
+    if keep_:
+        score += 10
+    return round(score, 3)
+
+
+@dataclass(slots=True)
+class AdmissionController:
+    """Caps concurrent captures, queues and preempts by priority score.
+
+    Only touched from the supervisor loop, so no locking is needed.
+    """
+
+    limit: int
+    sessions: dict[str, float] = field(default_factory=dict)
+    queued: dict[str, tuple[float, StreamerData]] = field(default_factory=dict)
+    preempted: set[str] = field(default_factory=set)
+
+    def running(self) -> int:
+        return len(self.sessions) - len(self.preempted)
+
+    def request(self, data: StreamerData, score: float) -> Admission:
+        name_ = data.name_
+
+        if name_ in self.preempted:
+            self.requeue(name_, data)
+            return Admission(False)
+
+        # restarts and reserved slots keep their session
+        if name_ in self.sessions:
+            return Admission(True)
+
+        if self.running() < self.limit:
+            self.sessions[name_] = score
+            self.queued.pop(name_, None)
+            return Admission(True)
+
+        candidates = {k: v for k, v in self.sessions.items() if k not in self.preempted}
+        lowest = min(candidates, key=candidates.__getitem__, default=None)
+
+        if lowest is not None and candidates[lowest] < score:
+            self.preempted.add(lowest)
+            self.sessions[name_] = score
+            self.queued.pop(name_, None)
+            return Admission(True, lowest)
+
+        self.queued[name_] = (score, data)
+        return Admission(False)
+
+    def take_preempted(self, name_: str) -> bool:
+        return name_ in self.preempted
+
+    def requeue(self, name_: str, data: StreamerData) -> None:
+        score = self.sessions.pop(name_, 0.0)
+        self.preempted.discard(name_)
+        self.queued[name_] = (score, data)
+
+    def release(self, name_: str) -> StreamerData | None:
+        self.sessions.pop(name_, None)
+        self.preempted.discard(name_)
+
+        if not self.queued or self.running() >= self.limit:
+            return None
+
+        # reserve the slot for the best queued streamer
+        best = max(self.queued, key=lambda x: self.queued[x][0])
+        score, data = self.queued.pop(best)
+        self.sessions[best] = score
+        return data
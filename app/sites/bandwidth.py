@@ -0,0 +1,92 @@
+from dataclasses import dataclass, field
+from threading import Lock
+
+from app.utils.named_tuples import HlsVariant
+
+
+def priority_class(score: float) -> str:
+    # keep_ adds 10 to the admission score
+    if score >= 10:
+        return "high"
+    if score >= 6:
+        return "normal"
+    return "low"
+
+
+def choose_variant(
+    variants: list[HlsVariant], max_height: int, remaining_kbps: float | None
+) -> HlsVariant:
+    ladder = sorted(variants, key=lambda x: x.bandwidth)
+    allowed = [x for x in ladder if not x.height or x.height <= max_height] or ladder[:1]
+
+    if remaining_kbps is None:
+        return allowed[-1]
+
+    fits = [x for x in allowed if x.bandwidth / 1000 <= remaining_kbps]
+    return fits[-1] if fits else allowed[0]
+
+
+@dataclass(slots=True)
+class BandwidthBudget:
+    """Track the bitrate of every active capture against a downstream limit"""
+
+    limit_kbps: int
+    # name_ -> (kbps, score, kbps of the lowest rung)
+    active: dict[str, tuple[float, float, float]] = field(default_factory=dict)
+    # stopped to restart on a cheaper rung, not because the capture failed
+    stepping_down: set[str] = field(default_factory=set)
+    lock: Lock = field(default_factory=Lock)
+
+    def used(self, exclude: str | None = None, min_score: float | None = None) -> float:
+        return sum(
+            kbps
+            for name_, (kbps, score, _) in self.active.items()
+            if name_ != exclude and (min_score is None or score >= min_score)
+        )
+
+    def reserve(
+        self, name_: str, variants: list[HlsVariant], score: float, max_height: int
+    ) -> HlsVariant:
+        with self.lock:
+            # lower priority captures are stepped down afterwards, see over_budget
+            remaining = None
+            if self.limit_kbps > 0:
+                remaining = self.limit_kbps - self.used(exclude=name_, min_score=score)
+
+            variant = choose_variant(variants, max_height, remaining)
+            lowest = min(variants, key=lambda x: x.bandwidth)
+            self.active[name_] = (variant.bandwidth / 1000, score, lowest.bandwidth / 1000)
+            return variant
+
+    def over_budget(self) -> list[str]:
+        """Lowest priority captures to step down a rung until the sum fits"""
+        with self.lock:
+            if self.limit_kbps <= 0:
+                return []
+
+            excess = self.used() - self.limit_kbps
+            step_down = []
+            for name_, (kbps, _, floor_kbps) in sorted(
+                self.active.items(), key=lambda x: x[1][1]
+            ):
+                if excess <= 0:
+                    break
+                if kbps > floor_kbps:
+                    step_down.append(name_)
+                    excess -= kbps - floor_kbps
+            return step_down
+
+    def step_down(self, name_: str) -> None:
+        with self.lock:
+            self.stepping_down.add(name_)
+
+    def take_step_down(self, name_: str) -> bool:
+        with self.lock:
+            if name_ not in self.stepping_down:
+                return False
+            self.stepping_down.discard(name_)
+            return True
+
+    def release(self, name_: str) -> None:
+        with self.lock:
+            self.active.pop(name_, None)
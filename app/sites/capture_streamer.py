@@ -1,27 +1,34 @@
 import asyncio
 from collections.abc import Iterable
 import math
-from random import choice
-from string import ascii_lowercase, digits
-import subprocess
+import os
+from asyncio.subprocess import DEVNULL, PIPE, Process
 from dataclasses import dataclass, field
 from io import TextIOWrapper
 from logging import DEBUG, INFO, getLogger
 from pathlib import Path
-from subprocess import DEVNULL, PIPE, Popen
-from threading import Thread
-from time import sleep, strftime
+from time import strftime
+from httpx import HTTPError
 from termcolor import colored
-from app.database.db_query import db_cap_status
-from app.database.db_writes import db_remove_pid, db_update_pid
+from app.config.settings import get_settings
+from app.database.db_query import db_cap_status, db_priority
+from app.database.db_writes import db_clear_pid, db_update_pid
+from app.sites.admission import priority_score
+from app.sites.bandwidth import priority_class
+from app.sites.capture_supervisor import get_supervisor
 from app.sites.create_streamer import CreateStreamer
-from app.sites.getstreamerurl import get_streamer_url
-from app.utils.general_utils import recent_api_call
+from app.sites.finalize import finalize_streamer
+from app.sites.getstreamerurl import resolve_streamer_urls
+from app.sites.hls_engine import HlsDownloader, hls_client, parse_master, remux_args
+from app.sites.storage import get_allocator
+from app.sites.url_cache import get_url_cache
 from app.utils.named_tuples import HlsQueryResults, StreamerData, StreamerWithPid
+from app.utils.session_history import get_session_history
 
 log = getLogger(__name__)
 
 log.setLevel(INFO)
+config = get_settings()
 
 @dataclass(
     slots=True,
@@ -49,7 +56,8 @@ class CaptureStreamer:
     args_ffmpeg: list = field(default_factory=list)
     pid: int = field(default=0, init=False)
     capture_time: int = field(default=55, init=False)
-    process: Popen[bytes] = field(init=False)
+    score: float = field(default=0.0, init=False)
+    downloader: HlsDownloader | None = field(default=None, init=False)
 
     def __post_init__(self):
 
@@ -67,16 +75,10 @@ class CaptureStreamer:
     def create_path(self):
         self.data.path_.mkdir(parents=True, exist_ok=True)
 
-    def random_str(self) -> str:
-        letters = f"{ascii_lowercase}{digits}"
-        return "-sd-" + "".join(choice(letters) for _ in range(64)) + "_trns_h264"
-
-    def generate_url(self, name_: str, domain: str):
-        random_string = self.random_str()
-        url = f"https://{domain}/live-hls/amlst:{name_}{random_string}/playlist.m3u8"
-        return url
-
     def ffmpeg_args(self):
+        if config.capture_mode == "segment":
+            return self.segment_args()
+
         args = [
             "ffmpeg",
             "-hide_banner",
@@ -99,104 +101,250 @@ class CaptureStreamer:
         ]
         return args
 
+    def segment_args(self):
+        # one ffmpeg for the whole broadcast, files roll over without a gap
+        # every video_length_seconds, ffmpeg can't split a segment by size
+        args = [
+            "ffmpeg",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-progress",
+            "pipe:1",
+            "-i",
+            self.url,
+            *self.metadata,
+            "-map",
+            "0",
+            "-c:v",
+            "copy",
+            "-c:a",
+            "copy",
+            "-f",
+            "segment",
+            "-segment_format",
+            "matroska",
+            "-segment_time",
+            f"{config.video_length_seconds}",
+            "-reset_timestamps",
+            "1",
+            "-strftime",
+            "1",
+            self.file,
+        ]
+        return args
+
     def std_out(self) -> int | TextIOWrapper:
         if log.isEnabledFor(DEBUG):
             return open(f"{self.path_}/stdout.log", "w+", encoding="utf-8")
 
         return PIPE
 
-    def time_limit_reached(self, process: Popen):
-        time_value: int = 0
-        progress_value: str = ""
+    async def time_limit_reached(self, process: Process):
+        tracker = get_supervisor().track(self.name_)
         if process.stdout is not None:
-            for output in process.stdout:
-                if "out_time_ms" in (line := output.strip()):
-                    _, t = line.split("=")
-                    time_value = int(t)
-
-                if "end" in (line := output.strip()):
-                    _, progress_value = line.split("=")
+            async for raw in process.stdout:
+                sample = tracker.feed(raw.decode("utf-8", errors="replace"))
+                if sample is None:
+                    continue
 
                 if (
-                    math.ceil(int(time_value) / 1e6) == self.capture_time
-                    and progress_value == "end"
+                    math.ceil(sample.out_time_us / 1e6) == self.capture_time
+                    and sample.progress == "end"
                 ):
                     return True
         return False
 
-    def subprocess_status(self, db_model: StreamerWithPid, process: Popen):
-        pid, name_, site = db_model
+    async def select_variant(self) -> None:
+        supervisor = get_supervisor()
+        # without a budget there is nothing to share, keep the default variant
+        if supervisor.bandwidth.limit_kbps <= 0:
+            return None
+
+        try:
+            response = await hls_client().get(f"{self.url}", timeout=15)
+            response.raise_for_status()
+        except HTTPError as error:
+            log.debug(f"{self.name_} master playlist: {error}")
+            return None
+
+        if not (variants := parse_master(response.text, f"{self.url}")):
+            return None
+
+        max_height = config.variant_max_height.get(priority_class(self.score), 1080)
+        variant = supervisor.bandwidth.reserve(
+            self.name_, variants, self.score, max_height
+        )
+        self.url = variant.url
+        self.args_ffmpeg = self.ffmpeg_args()
+
+        # lower priority captures restart on a cheaper rung
+        for name_ in supervisor.bandwidth.over_budget():
+            if name_ == self.name_:
+                continue
+            supervisor.bandwidth.step_down(name_)
+            if supervisor.stop(name_):
+                log.info(f"{strftime("%H:%M:%S")}: Stepping down {colored(name_, "yellow")}")
+            else:
+                supervisor.bandwidth.take_step_down(name_)
+
+    async def record_ffmpeg(self) -> bool:
+        supervisor = get_supervisor()
+        process = await supervisor.spawn(self.name_, self.args_ffmpeg, self.std_out())
+        await asyncio.to_thread(
+            db_update_pid, StreamerWithPid(process.pid, self.name_, self.site)
+        )
+
+        try:
+            max_time = await self.time_limit_reached(process)
+            await process.wait()
+        finally:
+            supervisor.release(self.name_, process)
+            supervisor.bandwidth.release(self.name_)
+
+        return max_time
+
+    async def record_native(self) -> bool:
+        supervisor = get_supervisor()
+        self.downloader = HlsDownloader(
+            self.name_, f"{self.url}", self.path_, self.data.file
+        )
+        # stays registered through the remux and restart wait so stop still finds it
+        supervisor.downloads[self.name_] = self.downloader
+        # no child process while downloading, the pid marks the capture as active
+        await asyncio.to_thread(
+            db_update_pid, StreamerWithPid(os.getpid(), self.name_, self.site)
+        )
+
+        try:
+            parts = await self.downloader.run()
+        finally:
+            supervisor.bandwidth.release(self.name_)
+
+        for part in parts:
+            process = await asyncio.create_subprocess_exec(
+                *remux_args(part, self.metadata),
+                stdin=DEVNULL,
+                stdout=DEVNULL,
+                stderr=DEVNULL,
+                start_new_session=True,
+            )
+            if await process.wait() == 0:
+                part.unlink()
+
+        return False
+
+    async def admit(self) -> bool:
+        supervisor = get_supervisor()
+        self.score = priority_score(*await asyncio.to_thread(db_priority, self.name_))
+        admission = supervisor.admission.request(self.data, self.score)
+
+        if admission.evict is not None:
+            log.info(
+                f"{strftime("%H:%M:%S")}: {colored(admission.evict, "yellow")} preempted by {colored(self.name_, "green")}"
+            )
+            supervisor.stop(admission.evict)
+
+        if not admission.admitted:
+            get_allocator().release(self.name_)
+            log.info(
+                f"{strftime("%H:%M:%S")}: Capture limit reached, {colored(self.name_, "yellow")} queued"
+            )
+        return admission.admitted
+
+    async def subprocess_status(self):
+        try:
+            admitted = await self.admit()
+        finally:
+            # admitted or queued, admission now knows this streamer
+            get_supervisor().unreserve([self.name_])
+
+        if not admitted:
+            return None
+
+        name_, site = self.name_, self.site
+        get_session_history().observe([(name_, None)])
+        admission = get_supervisor().admission
+        session_kept: bool = False
 
         max_time: bool = False
         err = f"{strftime("%H:%M:%S")}: {colored(f"{name_} from {site} stopped", "yellow")}"
         try:
-            while True:
-                if process.poll() is not None:
-                    print(err)
-                    break
-
-                max_time = self.time_limit_reached(process)
-                if bool(max_time):
-                    print(err)
-                    print("max:", max_time)
-                    break
-
-            if recent_api_call():
-                log.info(
-                    f"{strftime("%H:%M:%S")}: {colored('Awaiting api rest capture_streamer','yellow')}"
-                )
-                sleep(90)
-                log.info(
-                    f"{strftime("%H:%M:%S")}: {colored('resuming api call','yellow')}"
-                )
-
-            sleep(9)
-
-            follow, block, domain = db_cap_status(name_)
+            await self.select_variant()
+            if config.capture_engine == "native":
+                max_time = await self.record_native()
+            else:
+                max_time = await self.record_ffmpeg()
+
+            print(err)
+            if bool(max_time):
+                print("max:", max_time)
+
+            stepped_down = get_supervisor().bandwidth.take_step_down(name_)
+            if admission.take_preempted(name_):
+                await asyncio.to_thread(db_clear_pid, name_)
+                admission.requeue(name_, self.data)
+                get_allocator().release(name_)
+                session_kept = True
+                return None
+
+            # a step down restarts at once, the stream never went away
+            if not stepped_down:
+                await asyncio.sleep(9)
+
+            follow, block, _ = await asyncio.to_thread(db_cap_status, name_)
+            await asyncio.to_thread(db_clear_pid, name_)
 
             if not bool(follow) or bool(block):
-                db_remove_pid(pid)
                 return None
 
-            db_remove_pid(pid)
-
-            data = [
-                HlsQueryResults(
-                    name_,
-                    success=True,
-                    url=self.generate_url(name_, domain),
-                    domain=domain,
-                )
-            ]
-            if not max_time:
-                data = asyncio.run(get_streamer_url([name_]))
+            # a clean cut or step down can reuse or synthesize the url, a failure needs the api
+            ladder = ("cache", "synth", "api")
+            if not max_time and not stepped_down:
+                get_url_cache().invalidate(name_)
+                ladder = ("api",)
                 print(":oops")
 
-            re_streamer = [
-                CreateStreamer(*x).return_data for x in data if isinstance(x, Iterable)
-            ]
+            data = await resolve_streamer_urls([name_], ladder)
+            re_streamer = await create_streamers(data)
 
+            # new captures are scheduled on the supervisor loop, not nested
             _ = [CaptureStreamer(x) for x in re_streamer if isinstance(x, Iterable)]
+            session_kept = any(x.url for x in re_streamer if isinstance(x, Iterable))
         except CaptureError as e:
             log.info(e.msg)
+        finally:
+            if self.downloader is not None:
+                get_supervisor().forget(name_, self.downloader)
+            if not session_kept:
+                await release_session(name_, self.path_)
 
     def activate(self):
-        process = Popen(
-            self.args_ffmpeg,
-            stdin=DEVNULL,
-            stdout=self.std_out(),
-            stderr=subprocess.STDOUT,
-            start_new_session=True,
-            encoding="utf8",
-            universal_newlines=True,
-        )
-        pid = process.pid
-        db_model = StreamerWithPid(pid, self.name_, self.site)
+        get_supervisor().submit(self.subprocess_status())
 
-        db_update_pid(db_model)
 
-        thread = Thread(
-            target=self.subprocess_status, args=(db_model, process), daemon=True
-        )
-        thread.start()
-        del self
+async def create_streamers(data: list[HlsQueryResults]) -> list[StreamerData]:
+    # db writes and statvfs on every mount, kept off the supervisor loop
+    return await asyncio.to_thread(
+        lambda: [CreateStreamer(*x).return_data for x in data if isinstance(x, Iterable)]
+    )
+
+
+async def release_session(name_: str, path_: Path) -> None:
+    supervisor = get_supervisor()
+    get_allocator().release(name_)
+    # globbing and queueing the joins touch the disk, never block the loop
+    await asyncio.to_thread(finalize_streamer, name_, path_)
+
+    if (queued := supervisor.admission.release(name_)) is not None:
+        supervisor.submit(resume_queued(queued))
+
+
+async def resume_queued(queued: StreamerData) -> None:
+    # queued urls go stale, resolve a fresh one before capturing
+    data = await resolve_streamer_urls([queued.name_])
+    re_streamer = await create_streamers(data)
+    _ = [CaptureStreamer(x) for x in re_streamer if isinstance(x, Iterable)]
+
+    if not any(x.url for x in re_streamer if isinstance(x, Iterable)):
+        await release_session(queued.name_, queued.path_)
@@ -0,0 +1,143 @@
+import asyncio
+from collections.abc import Coroutine, Iterable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from io import TextIOWrapper
+from logging import getLogger
+from pathlib import Path
+from subprocess import DEVNULL, STDOUT
+from threading import Lock, Thread
+from typing import Any
+
+from app.config.settings import get_settings
+from app.sites.admission import AdmissionController
+from app.sites.bandwidth import BandwidthBudget
+from app.sites.ffmpeg_progress import ProgressTracker
+from app.sites.hls_engine import HlsDownloader
+from app.utils.named_tuples import CaptureStats
+
+log = getLogger(__name__)
+config = get_settings()
+
+
+@dataclass(slots=True)
+class CaptureSupervisor:
+    """Owns every ffmpeg child on a single event loop thread"""
+
+    loop: asyncio.AbstractEventLoop = field(init=False)
+    thread: Thread = field(init=False)
+    processes: dict[str, asyncio.subprocess.Process] = field(default_factory=dict)
+    tasks: set[asyncio.Task[Any]] = field(default_factory=set)
+    progress: dict[str, ProgressTracker] = field(default_factory=dict)
+    downloads: dict[str, HlsDownloader] = field(default_factory=dict)
+    # streamers between the start decision and their admission
+    pending: set[str] = field(default_factory=set)
+    lock: Lock = field(default_factory=Lock)
+    admission: AdmissionController = field(init=False)
+    bandwidth: BandwidthBudget = field(init=False)
+
+    def __post_init__(self):
+        self.admission = AdmissionController(config.max_captures)
+        self.bandwidth = BandwidthBudget(config.bandwidth_budget_kbps)
+        self.loop = asyncio.new_event_loop()
+        self.thread = Thread(target=self.run, name="capture_supervisor", daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> Future[Any]:
+        # thread safe, also used from the supervisor loop to schedule restarts
+        return asyncio.run_coroutine_threadsafe(self._track(coro), self.loop)
+
+    def run_sync(self, coro: Coroutine[Any, Any, Any]) -> Any:
+        # lets the CLI thread reuse this loop's long lived http clients
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def _track(self, coro: Coroutine[Any, Any, Any]):
+        task = asyncio.current_task()
+        if task is not None:
+            self.tasks.add(task)
+        try:
+            return await coro
+        except Exception as error:
+            log.error(error)
+        finally:
+            self.tasks.discard(task)  # type: ignore
+
+    async def spawn(
+        self, name_: str, args: list[str | Path], stdout: int | TextIOWrapper
+    ) -> asyncio.subprocess.Process:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=DEVNULL,
+            stdout=stdout,
+            stderr=STDOUT,
+            start_new_session=True,
+        )
+        self.processes[name_] = process
+        return process
+
+    def release(self, name_: str, process: asyncio.subprocess.Process) -> None:
+        if self.processes.get(name_) is process:
+            del self.processes[name_]
+            self.progress.pop(name_, None)
+
+    def reserve(self, name_: str) -> bool:
+        """Claim a streamer before its url lookup, False if already starting, queued or capturing"""
+        with self.lock:
+            # admission adds the session before the reservation is dropped,
+            # queued streamers are resumed by release, not by a new sweep
+            admission = self.admission
+            if name_ in self.pending or name_ in admission.sessions or name_ in admission.queued:
+                return False
+            self.pending.add(name_)
+            return True
+
+    def unreserve(self, names: Iterable[str]) -> None:
+        with self.lock:
+            self.pending.difference_update(names)
+
+    def forget(self, name_: str, downloader: HlsDownloader) -> None:
+        # a restart may already have registered its own downloader
+        if self.downloads.get(name_) is downloader:
+            del self.downloads[name_]
+
+    def track(self, name_: str) -> ProgressTracker:
+        tracker = ProgressTracker(name_)
+        self.progress[name_] = tracker
+        return tracker
+
+    def stats(self, name_: str) -> CaptureStats | None:
+        if (tracker := self.progress.get(name_)) is None:
+            return None
+        return tracker.stats()
+
+    def stop(self, name_: str) -> bool:
+        if (process := self.processes.get(name_)) is not None:
+            self.loop.call_soon_threadsafe(process.terminate)
+            return True
+
+        if (downloader := self.downloads.get(name_)) is not None:
+            self.loop.call_soon_threadsafe(downloader.stop)
+            return True
+
+        return False
+
+    def active(self) -> list[str]:
+        return [*self.processes, *self.downloads]
+
+
+_supervisor: CaptureSupervisor | None = None
+_supervisor_lock = Lock()
+
+
+def get_supervisor() -> CaptureSupervisor:
+    # the cli and online status threads may both ask first, only one loop starts
+    global _supervisor
+    if _supervisor is None:
+        with _supervisor_lock:
+            if _supervisor is None:
+                _supervisor = CaptureSupervisor()
+    return _supervisor
@@ -10,6 +10,7 @@ from app.config.settings import get_settings
 from collections.abc import Callable
 
 from app.database.db_writes import db_add_streamer
+from app.sites.storage import get_allocator
 from app.utils.named_tuples import StreamerData
 
 
@@ -30,6 +31,11 @@ class FileSvs:
         slug = slug.upper()
         return f'{name_} [{slug}] {str(now.strftime("(%Y-%m-%d) %H%M%S"))}.mkv'
 
+    def set_segment_name(self, name_: str, slug: str) -> str:
+        # expanded by ffmpeg's segment muxer (-strftime 1) as each file opens
+        slug = slug.upper()
+        return f"{name_} [{slug}] (%Y-%m-%d) %H%M%S.mkv"
+
 
 @dataclass(slots=True, eq=False)
 class CreateStreamer(FileSvs):
@@ -65,8 +71,11 @@ class CreateStreamer(FileSvs):
                 )
             )
 
-        self.path_ = self.set_video_path(self.name_, self.site_name)
+        mount = get_allocator().choose(self.name_) if self.url else config.VIDEO_DIR
+        self.path_ = self.set_video_path(self.name_, self.site_name, mount)
         self.filename = self.set_filename(self.name_, self.site_slug)
+        if config.capture_mode == "segment" or config.capture_engine == "native":
+            self.filename = self.set_segment_name(self.name_, self.site_slug)
         self.metadata = self.set_metadata(self.name_, self.site_name)
         self.return_data = StreamerData(
             self.name_,
@@ -0,0 +1,111 @@
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from threading import Lock
+from time import monotonic
+
+from app.utils.named_tuples import CaptureStats, ProgressSample
+
+
+def _number(value: str, suffix: str = "") -> float:
+    # ffmpeg reports N/A until a value is known, e.g. bitrate=N/A, speed=N/A
+    value = value.strip().removesuffix(suffix)
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+
+@dataclass(slots=True)
+class ProgressTracker:
+    """Parse ffmpeg -progress output into a fixed size ring buffer of samples.
+
+    Fed on the supervisor loop, read from the CLI thread, readers work on a
+    copy taken under the lock.
+    """
+
+    name_: str
+    stall_seconds: float = 20.0
+    # ffmpeg writes a -progress block every stats_period, 0.5s by default
+    period: float = 0.5
+    samples: deque[ProgressSample] = field(init=False)
+    pending: dict[str, str] = field(default_factory=dict)
+    lock: Lock = field(default_factory=Lock)
+
+    def __post_init__(self):
+        # twice the stall window, a frozen out_time must still be in the ring
+        self.samples = deque(maxlen=2 * math.ceil(self.stall_seconds / self.period))
+
+    def feed(self, line: str) -> ProgressSample | None:
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            return None
+
+        if key != "progress":
+            self.pending[key] = value
+            return None
+
+        # progress= closes each block of key=value pairs
+        block, self.pending = self.pending, {}
+        sample = ProgressSample(
+            wall=monotonic(),
+            frame=int(_number(block.get("frame", "0"))),
+            fps=_number(block.get("fps", "0")),
+            bitrate=_number(block.get("bitrate", "0"), "kbits/s"),
+            total_size=int(_number(block.get("total_size", "0"))),
+            out_time_us=int(_number(block.get("out_time_us", block.get("out_time_ms", "0")))),
+            drop_frames=int(_number(block.get("drop_frames", "0"))),
+            speed=_number(block.get("speed", "0"), "x"),
+            progress=value,
+        )
+        with self.lock:
+            self.samples.append(sample)
+        return sample
+
+    def snapshot(self) -> list[ProgressSample]:
+        with self.lock:
+            return list(self.samples)
+
+    @property
+    def last(self) -> ProgressSample | None:
+        samples = self.snapshot()
+        return samples[-1] if samples else None
+
+    def throughput(self, samples: list[ProgressSample] | None = None) -> float:
+        # kbit/s written to disk across the ring buffer
+        samples = self.snapshot() if samples is None else samples
+        if len(samples) < 2:
+            return samples[-1].bitrate if samples else 0.0
+
+        first, last = samples[0], samples[-1]
+        elapsed = last.wall - first.wall
+        if elapsed <= 0:
+            return last.bitrate
+        return max(0.0, (last.total_size - first.total_size) * 8 / 1000 / elapsed)
+
+    def stalled(
+        self, now: float | None = None, samples: list[ProgressSample] | None = None
+    ) -> bool:
+        samples = self.snapshot() if samples is None else samples
+        if not samples:
+            return False
+
+        last = samples[-1]
+
+        now = monotonic() if now is None else now
+        if now - last.wall > self.stall_seconds:
+            return True
+
+        # out_time frozen for the whole stall window
+        window = [x for x in samples if last.wall - x.wall >= self.stall_seconds]
+        return bool(window) and window[-1].out_time_us >= last.out_time_us
+
+    def stats(self) -> CaptureStats:
+        samples = self.snapshot()
+        last = samples[-1] if samples else None
+        return CaptureStats(
+            kbps=round(self.throughput(samples), 1),
+            speed=last.speed if last else 0.0,
+            drop_frames=last.drop_frames if last else 0,
+            stalled=self.stalled(samples=samples),
+        )
@@ -0,0 +1,195 @@
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache, partial
+from logging import getLogger
+from multiprocessing import get_context
+from pathlib import Path
+from threading import Lock
+from time import strftime
+
+from termcolor import colored
+
+from app.config.settings import get_settings
+from app.sites.tiering import get_mover
+
+log = getLogger(__name__)
+config = get_settings()
+
+PART_TIME = re.compile(r"\((\d{4}-\d{2}-\d{2})\) (\d{6})\.mkv$")
+# share of video_length_seconds a part must run to count as rolled over
+FULL_PART = 0.9
+
+
+def part_start(part: Path) -> datetime | None:
+    if (match := PART_TIME.search(part.name)) is None:
+        return None
+    return datetime.strptime(" ".join(match.groups()), "%Y-%m-%d %H%M%S")
+
+
+def group_sessions(
+    parts: list[Path], gap_seconds: int, full_seconds: float | None = None
+) -> list[list[Path]]:
+    # a part starting within gap_seconds of the previous part's last write
+    # belongs to the same broadcast, a part that ran full_seconds was rolled
+    # over on purpose and the next part starts its own file
+    dated = sorted(
+        ((start, x) for x in parts if (start := part_start(x)) is not None),
+        key=lambda x: x[0],
+    )
+
+    sessions: list[list[Path]] = []
+    last_write = 0.0
+    rolled = False
+    for start, part in dated:
+        if not sessions or rolled or start.timestamp() - last_write > gap_seconds:
+            sessions.append([])
+        sessions[-1].append(part)
+        last_write = part.stat().st_mtime
+        rolled = full_seconds is not None and last_write - start.timestamp() >= full_seconds
+
+    return sessions
+
+
+def _low_priority() -> None:
+    os.nice(19)
+    if ionice := shutil.which("ionice"):
+        subprocess.run([ionice, "-c", "3", "-p", f"{os.getpid()}"], check=False)
+
+
+def _quote(part: str) -> str:
+    # concat demuxer escaping for single quotes inside a quoted path
+    return part.replace("'", "'\\''")
+
+
+def concat_session(parts: list[str]) -> str | None:
+    """Losslessly join the parts of one session into the first part's filename"""
+    first = Path(parts[0])
+    joined = first.with_suffix(".joining.mkv")
+
+    # a unique list file, another session of the same streamer may be joining
+    handle, list_path = tempfile.mkstemp(
+        prefix=f"{first.stem}.", suffix=".concat.txt", dir=first.parent
+    )
+    os.close(handle)
+    list_file = Path(list_path)
+    lines = [f"file '{_quote(x)}'" for x in parts]
+    list_file.write_text("\n".join(lines), encoding="utf-8")
+
+    args: list[str | Path] = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        list_file,
+        "-map",
+        "0",
+        "-c",
+        "copy",
+        joined,
+    ]
+    try:
+        result = subprocess.run(args, stdin=subprocess.DEVNULL, check=False)
+    finally:
+        list_file.unlink(missing_ok=True)
+
+    if result.returncode != 0:
+        joined.unlink(missing_ok=True)
+        return None
+
+    for part in parts:
+        Path(part).unlink(missing_ok=True)
+    joined.rename(first)
+
+    return str(first)
+
+
+@dataclass(slots=True)
+class InFlight:
+    """Parts handed to a join job, later releases leave them to that job"""
+
+    parts: dict[str, set[Path]] = field(default_factory=dict)
+    lock: Lock = field(default_factory=Lock)
+
+    def busy(self, name_: str) -> set[Path]:
+        with self.lock:
+            return set(self.parts.get(name_, ()))
+
+    def add(self, name_: str, session: list[Path]) -> None:
+        with self.lock:
+            self.parts.setdefault(name_, set()).update(session)
+
+    def discard(self, name_: str, session: list[Path]) -> None:
+        with self.lock:
+            if (parts := self.parts.get(name_)) is None:
+                return None
+            parts.difference_update(session)
+            if not parts:
+                del self.parts[name_]
+
+
+@lru_cache()
+def get_in_flight() -> InFlight:
+    return InFlight()
+
+
+@lru_cache()
+def get_finalizer() -> ProcessPoolExecutor:
+    # forkserver, the app is multi threaded by the time the pool starts
+    return ProcessPoolExecutor(
+        max_workers=config.finalize_workers,
+        mp_context=get_context("forkserver"),
+        initializer=_low_priority,
+    )
+
+
+def _finalized(name_: str, session: list[Path], future: Future[str | None]) -> None:
+    try:
+        if (error := future.exception()) is not None:
+            log.error(error)
+            return None
+
+        if (output := future.result()) is None:
+            log.error(colored("Unable to join capture parts", "red"))
+            return None
+
+        log.info(f"{strftime("%H:%M:%S")}: Joined {colored(Path(output).name, "green")}")
+        get_mover().submit(name_, Path(output))
+    finally:
+        get_in_flight().discard(name_, session)
+
+
+def finalize_streamer(name_: str, path_: Path) -> None:
+    """Queue every finished session in a streamer's folder for joining and archiving"""
+    in_flight = get_in_flight()
+    busy = in_flight.busy(name_)
+    parts = [
+        x
+        for x in path_.glob("*.mkv")
+        if not x.name.endswith(".joining.mkv") and x not in busy
+    ]
+
+    # timed captures restart ffmpeg every part, segments and native parts
+    # roll over by length, only the fragments a restart cut short are joined
+    full_seconds = None
+    if config.capture_mode == "segment" or config.capture_engine == "native":
+        full_seconds = config.video_length_seconds * FULL_PART
+
+    for session in group_sessions(parts, config.session_gap_seconds, full_seconds):
+        if len(session) < 2:
+            get_mover().submit(name_, session[0])
+            continue
+
+        in_flight.add(name_, session)
+        future = get_finalizer().submit(concat_session, [str(x) for x in session])
+        future.add_done_callback(partial(_finalized, name_, session))
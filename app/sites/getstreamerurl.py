@@ -1,38 +1,82 @@
 import asyncio
+from functools import partial
 from typing import Any
 from urllib.parse import urlparse
 from logging import getLogger
 from time import perf_counter
 from httpx import AsyncClient
 from termcolor import colored
+from app.database.db_query import db_domain
 from app.errors.custom_errors import GetDataError
-from app.utils.constants import HEADERS_STREAM_URL
+from app.sites.url_cache import generate_url, get_url_cache
+from app.utils.batch_requests import get_hedge, run_batch
+from app.utils.http_clients import get_client
 from app.utils.named_tuples import HlsQueryResults
 
 
 log = getLogger(__name__)
 
 
-async def get_streamer_url(streamers: list[str]):
+async def get_streamer_url(streamers: list[str]) -> list[HlsQueryResults]:
     start_ = perf_counter()
-    results: list[HlsQueryResults] = []
-    async with AsyncClient(headers=HEADERS_STREAM_URL, http2=True) as client:
-        try:
-            async with asyncio.TaskGroup() as group:
-                for name_ in streamers:
-                    task = group.create_task(get_data(client, name_))
-                    task.add_done_callback(lambda t: results.append(t.result()))
-        except asyncio.CancelledError:
-            print("get_streamer_url():  was canceled")
-
-    if len(streamers) > 1:
+    client = get_client("stream_url")
+
+    # failed lookups are left out, resolve_streamer_urls fills them as unresolved
+    results, report = await run_batch(
+        streamers, partial(get_data, client), get_hedge("stream_url")
+    )
+    report.log_errors(log, "Edge url")
+
+    if len(streamers) > 1 or report.errors:
         log.info(
-            f"Processed {colored(len(results),"green")} streamers in: {colored(round(perf_counter() - start_,4), 'green')} seconds"
+            f"Processed {colored(len(results),"green")} streamers in: {colored(round(perf_counter() - start_,4), 'green')} seconds, {report.summary()}"
         )
 
     return results
 
 
+async def resolve_streamer_urls(
+    streamers: list[str], ladder: tuple[str, ...] = ("cache", "api")
+) -> list[HlsQueryResults]:
+    """Resolve edge urls through the fallback ladder: cache, synth, api"""
+    cache = get_url_cache()
+    results: list[HlsQueryResults] = []
+    remaining: list[str] = []
+
+    for name_ in streamers:
+        if "cache" in ladder and (cached := cache.get(name_)) is not None:
+            results.append(cached)
+            continue
+
+        if "synth" in ladder and (domain := cache.domain(name_) or db_domain(name_)):
+            results.append(
+                HlsQueryResults(
+                    name_, success=True, url=generate_url(name_, domain), domain=domain
+                )
+            )
+            continue
+
+        remaining.append(name_)
+
+    if not remaining or "api" not in ladder:
+        return results
+
+    # concurrent lookups for the same streamer share one request
+    owned, waiting = cache.claim(remaining)
+    fetched: list[HlsQueryResults] = []
+    try:
+        if owned:
+            fetched = await get_streamer_url(list(owned))
+    finally:
+        cache.finish(owned, fetched)
+
+    results.extend(fetched)
+    for future in waiting.values():
+        results.append(await asyncio.wrap_future(future))
+
+    return results
+
+
 async def get_data(client: AsyncClient, name_: str):
     # functionName=inspect.getframeinfo(inspect.currentframe()).function
 
@@ -0,0 +1,199 @@
+import asyncio
+from dataclasses import dataclass, field
+from logging import getLogger
+from pathlib import Path
+from time import strftime
+from typing import BinaryIO
+from urllib.parse import urljoin
+
+from httpx import AsyncClient, HTTPError
+from termcolor import colored
+
+from app.config.settings import get_settings
+from app.utils.http_clients import get_client
+from app.utils.named_tuples import HlsMediaPlaylist, HlsVariant
+
+log = getLogger(__name__)
+config = get_settings()
+
+WRITE_BUFFER = 4 * 1024 * 1024
+
+
+def parse_master(text: str, base_url: str) -> list[HlsVariant]:
+    variants: list[HlsVariant] = []
+    attrs: dict[str, str] = {}
+
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-STREAM-INF:"):
+            attrs = {}
+            for pair in line.split(":", 1)[1].split(","):
+                key, _, value = pair.partition("=")
+                attrs[key.strip()] = value.strip('"')
+            continue
+
+        if line and not line.startswith("#") and attrs:
+            _, _, height = attrs.get("RESOLUTION", "").partition("x")
+            variants.append(
+                HlsVariant(
+                    urljoin(base_url, line),
+                    int(attrs.get("BANDWIDTH", 0) or 0),
+                    int(height or 0),
+                )
+            )
+            attrs = {}
+
+    return variants
+
+
+def parse_media(text: str, base_url: str) -> HlsMediaPlaylist:
+    sequence = 0
+    target = 2.0
+    segments: list[tuple[str, float]] = []
+    duration = 0.0
+
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-MEDIA-SEQUENCE:"):
+            sequence = int(line.split(":", 1)[1])
+        elif line.startswith("#EXT-X-TARGETDURATION:"):
+            target = float(line.split(":", 1)[1])
+        elif line.startswith("#EXTINF:"):
+            duration = float(line.split(":", 1)[1].split(",")[0] or 0)
+        elif line and not line.startswith("#"):
+            segments.append((urljoin(base_url, line), duration))
+            duration = 0.0
+
+    return HlsMediaPlaylist(sequence, segments, target, "#EXT-X-ENDLIST" in text)
+
+
+def hls_client() -> AsyncClient:
+    # shared by every native capture on the supervisor loop
+    return get_client("hls")
+
+
+@dataclass(slots=True)
+class HlsDownloader:
+    name_: str
+    url: str
+    path_: Path
+    file_template: str
+    parts: list[Path] = field(default_factory=list)
+    next_sequence: int = field(default=-1, init=False)
+    part_seconds: float = field(default=0.0, init=False)
+    failures: int = field(default=0, init=False)
+    stopping: bool = field(default=False, init=False)
+    output: BinaryIO | None = field(default=None, init=False)
+
+    async def select_variant(self, client: AsyncClient) -> str:
+        response = await client.get(self.url, timeout=15)
+        response.raise_for_status()
+
+        if not (variants := parse_master(response.text, self.url)):
+            return self.url
+
+        return max(variants, key=lambda x: x.bandwidth).url
+
+    def open_part(self) -> None:
+        self.close_part()
+        # strftime expands the segment template, a plain filename is left as is
+        name_ = Path(strftime(self.file_template)).with_suffix(".ts")
+        part = Path(self.path_, name_)
+        self.output = open(part, "ab", buffering=WRITE_BUFFER)
+        self.parts.append(part)
+        self.part_seconds = 0.0
+
+    def stop(self) -> None:
+        self.stopping = True
+
+    def close_part(self) -> None:
+        if self.output is not None:
+            self.output.close()
+            self.output = None
+
+    async def fetch(self, client: AsyncClient, semaphore, url: str) -> bytes:
+        async with semaphore:
+            response = await client.get(url, timeout=15)
+            response.raise_for_status()
+            return response.content
+
+    async def run(self) -> list[Path]:
+        client = hls_client()
+        semaphore = asyncio.Semaphore(config.hls_segment_workers)
+        try:
+            media_url = await self.select_variant(client)
+            self.open_part()
+
+            while self.failures < 3 and not self.stopping:
+                try:
+                    response = await client.get(media_url, timeout=15)
+                    response.raise_for_status()
+                except HTTPError as error:
+                    self.failures += 1
+                    log.debug(f"{self.name_} playlist: {error}")
+                    await asyncio.sleep(2)
+                    continue
+
+                self.failures = 0
+                playlist = parse_media(response.text, media_url)
+                await self.write_new(client, semaphore, playlist)
+
+                if playlist.ended:
+                    break
+
+                await asyncio.sleep(max(1.0, playlist.target_duration / 2))
+        except HTTPError as error:
+            log.error(f"{strftime("%H:%M:%S")}: {colored(self.name_, "red")} {error}")
+        finally:
+            self.close_part()
+
+        return [x for x in self.parts if x.exists() and x.stat().st_size > 0]
+
+    async def write_new(self, client: AsyncClient, semaphore, playlist: HlsMediaPlaylist) -> None:
+        if self.next_sequence < 0:
+            self.next_sequence = playlist.sequence
+
+        start = max(0, self.next_sequence - playlist.sequence)
+        if not (new := playlist.segments[start:]):
+            return None
+
+        # fetch concurrently, write in playlist order
+        data = await asyncio.gather(
+            *[self.fetch(client, semaphore, url) for url, _ in new],
+            return_exceptions=True,
+        )
+        self.next_sequence = playlist.sequence + len(playlist.segments)
+
+        # a lost segment is a gap in the recording, not worth stopping for
+        missed = [(url, x) for (url, _), x in zip(new, data) if isinstance(x, BaseException)]
+        if missed:
+            for url, error in missed:
+                log.debug(f"{self.name_} segment {url}: {error}")
+            log.warning(
+                f"{strftime("%H:%M:%S")}: {colored(self.name_, "yellow")} missed {len(missed)} of {len(new)} segments, {missed[0][1]!r}"
+            )
+
+        chunk = b"".join(x for x in data if isinstance(x, bytes))
+        if self.output is not None and chunk:
+            await asyncio.to_thread(self.output.write, chunk)
+
+        self.part_seconds += sum(duration for _, duration in new)
+        if self.part_seconds >= config.video_length_seconds:
+            self.open_part()
+
+
+def remux_args(part: Path, metadata: list[str]) -> list[str | Path]:
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        part,
+        *metadata,
+        "-map",
+        "0",
+        "-c",
+        "copy",
+        part.with_suffix(".mkv"),
+    ]
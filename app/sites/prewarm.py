@@ -0,0 +1,126 @@
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from logging import getLogger
+from threading import Lock
+from time import monotonic, strftime, time
+
+from httpx import HTTPError
+from termcolor import colored
+
+from app.config.settings import get_settings
+from app.database.db_query import db_domain, db_session_starts
+from app.sites.capture_supervisor import get_supervisor
+from app.sites.create_streamer import FileSvs
+from app.sites.hls_engine import hls_client
+from app.sites.storage import get_allocator
+from app.sites.url_cache import get_url_cache
+from app.utils.poll_schedule import get_poll_scheduler
+
+log = getLogger(__name__)
+config = get_settings()
+
+DAY = 86400
+
+
+def usual_starts(starts: list[int], bin_minutes: int, min_sessions: int) -> list[int]:
+    """Seconds of the day that open a bin holding at least min_sessions starts"""
+    size = bin_minutes * 60
+    bins = Counter(
+        (x.hour * 3600 + x.minute * 60) // size
+        for x in map(datetime.fromtimestamp, starts)
+    )
+    return [b * size for b, n in bins.items() if n >= min_sessions]
+
+
+def seconds_until(start: int, bin_seconds: int, now: datetime) -> float:
+    """Seconds until a usual start of the day, 0 while inside its bin"""
+    delta = (start - (now.hour * 3600 + now.minute * 60 + now.second)) % DAY
+    if delta > DAY - bin_seconds:
+        return 0.0
+    return float(delta)
+
+
+async def warm_edge(domain: str) -> None:
+    # dns, tls and an http/2 connection are ready on the capture loop's client
+    try:
+        await hls_client().head(f"https://{domain}/", timeout=5)
+    except HTTPError:
+        pass
+
+
+@dataclass(slots=True)
+class Prewarmer:
+    """Get ready for streamers a few minutes before their usual start time.
+
+    Edge urls only resolve once a room is live, so the edge host is warmed
+    instead: dns, tls and a pooled connection on the capture loop.
+    """
+
+    lead: int
+    bin_minutes: int
+    min_sessions: int
+    lookback_days: int
+    warmed: dict[str, float] = field(default_factory=dict)
+    lock: Lock = field(default_factory=Lock)
+
+    def plan(self, skip: set[str]) -> dict[str, float]:
+        """Streamer -> seconds until their next usual start, within the lead window"""
+        starts: defaultdict[str, list[int]] = defaultdict(list)
+        for name_, started in db_session_starts(int(time()) - self.lookback_days * DAY):
+            starts[name_].append(started)
+
+        now = datetime.now()
+        # the predictor runs every few minutes, look one run past the lead
+        horizon = self.lead + config.prewarm_every
+        due: dict[str, float] = {}
+        for name_, times in starts.items():
+            if name_ in skip:
+                continue
+            for start in usual_starts(times, self.bin_minutes, self.min_sessions):
+                if (eta := seconds_until(start, self.bin_minutes * 60, now)) <= horizon:
+                    due[name_] = min(eta, due.get(name_, eta))
+        return due
+
+    def run(self, skip: set[str]) -> None:
+        due = self.plan(skip)
+        now = monotonic()
+        with self.lock:
+            self.warmed = {k: v for k, v in self.warmed.items() if v > now}
+            fresh = [x for x in due if x not in self.warmed]
+            for name_, eta in due.items():
+                self.warmed[name_] = now + eta + self.bin_minutes * 60
+
+        for name_ in fresh:
+            self.warm(name_, due[name_])
+
+        if fresh:
+            log.info(
+                f"{strftime("%H:%M:%S")}: Pre-warmed {colored(len(fresh), "green")} streamer(s) ahead of their usual start"
+            )
+
+    def warm(self, name_: str, eta: float) -> None:
+        now = monotonic()
+        get_poll_scheduler().focus(
+            name_, now + max(0.0, eta - self.lead), now + eta + self.bin_minutes * 60
+        )
+
+        path_ = FileSvs.set_video_path(name_, "Chaturbate", get_allocator().preview(name_))
+        try:
+            path_.mkdir(parents=True, exist_ok=True)
+        except OSError as error:
+            log.error(error)
+
+        if domain := get_url_cache().domain(name_) or db_domain(name_):
+            get_supervisor().submit(warm_edge(domain))
+
+
+@lru_cache()
+def get_prewarmer() -> Prewarmer:
+    return Prewarmer(
+        config.prewarm_lead_seconds,
+        config.prewarm_bin_minutes,
+        config.prewarm_min_sessions,
+        config.prewarm_lookback_days,
+    )
@@ -0,0 +1,106 @@
+import os
+import shutil
+from dataclasses import dataclass, field
+from functools import lru_cache
+from logging import getLogger
+from pathlib import Path
+from threading import Lock
+
+from app.config.settings import get_settings
+from app.utils.constants import DIRECTORIES
+
+log = getLogger(__name__)
+config = get_settings()
+
+
+@dataclass(slots=True)
+class StorageAllocator:
+    """Spread capture sessions across mounts by free space and active writers"""
+
+    mounts: list[Path]
+    min_free: int
+    staging: Path | None = None
+    writers: dict[int, int] = field(default_factory=dict)
+    sticky: dict[str, Path] = field(default_factory=dict)
+    lock: Lock = field(default_factory=Lock)
+
+    def usable(self, mounts: list[Path]) -> list[tuple[Path, int, int]]:
+        found = []
+        for mount in mounts:
+            try:
+                if not os.access(mount, os.W_OK):
+                    continue
+                free = shutil.disk_usage(mount).free
+                device = mount.stat().st_dev
+            except OSError:
+                continue
+
+            if free >= self.min_free:
+                found.append((mount, device, free))
+        return found
+
+    def pick(self) -> tuple[Path, int | None]:
+        # live writes land on the fast tier when it has room
+        found = self.usable([self.staging]) if self.staging else []
+        if not found and not (found := self.usable(self.mounts)):
+            return (config.VIDEO_DIR, None)
+
+        # writers are counted per device, two folders on one disk share a spindle
+        mount, device, _ = max(
+            found, key=lambda x: x[2] / (1 + self.writers.get(x[1], 0))
+        )
+        return (mount, device)
+
+    def choose(self, name_: str) -> Path:
+        with self.lock:
+            # every part of a session stays on one mount
+            if (mount := self.sticky.get(name_)) is not None:
+                return mount
+
+            mount, device = self.pick()
+            if device is None:
+                return mount
+
+            self.writers[device] = self.writers.get(device, 0) + 1
+            self.sticky[name_] = mount
+            log.debug(f"{name_} stored on {mount}")
+            return mount
+
+    def preview(self, name_: str) -> Path:
+        """Mount choose would return right now, without claiming a writer"""
+        with self.lock:
+            if (mount := self.sticky.get(name_)) is not None:
+                return mount
+            return self.pick()[0]
+
+    def release(self, name_: str) -> None:
+        with self.lock:
+            if (mount := self.sticky.pop(name_, None)) is None:
+                return None
+            try:
+                device = mount.stat().st_dev
+            except OSError:
+                return None
+            self.writers[device] = max(0, self.writers.get(device, 0) - 1)
+
+    def archive_mount(self) -> Path | None:
+        with self.lock:
+            if not (found := self.usable(self.mounts)):
+                return None
+            mount, _, _ = max(
+                found, key=lambda x: x[2] / (1 + self.writers.get(x[1], 0))
+            )
+            return mount
+
+    def active(self) -> dict[str, Path]:
+        with self.lock:
+            return dict(self.sticky)
+
+
+@lru_cache()
+def get_allocator() -> StorageAllocator:
+    min_free = config.min_free_gb * 1024**3
+    if config.use_staging:
+        staging, *bulk = DIRECTORIES
+        return StorageAllocator(bulk, min_free, staging)
+    return StorageAllocator(DIRECTORIES, min_free)
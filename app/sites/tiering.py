@@ -0,0 +1,124 @@
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from logging import getLogger
+from pathlib import Path
+from queue import Queue
+from threading import Thread
+from time import monotonic, sleep, strftime
+
+from termcolor import colored
+
+from app.config.settings import get_settings
+from app.database.db_writes import db_update_storage
+from app.sites.storage import get_allocator
+
+log = getLogger(__name__)
+config = get_settings()
+
+CHUNK = 8 * 1024 * 1024
+
+
+def storage_label(mount: Path) -> str:
+    # /mnt/Alpha/chaturbate -> Alpha, fits the storage VARCHAR(12) column
+    parts = mount.parts
+    label = parts[2] if len(parts) > 2 and parts[1] in ("mnt", "media") else mount.name
+    return label[:12]
+
+
+def _copy_chunk(src: int, dst: int, offset: int, count: int) -> int:
+    # kernel side copy, sendfile covers kernels without cross-device copy_file_range
+    try:
+        return os.copy_file_range(src, dst, count, offset, offset)
+    except OSError:
+        os.lseek(dst, offset, os.SEEK_SET)
+        return os.sendfile(dst, src, offset, count)
+
+
+def move_file(source: Path, target: Path, bytes_per_sec: int) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(f"{target.name}.moving")
+    size = source.stat().st_size
+    started = monotonic()
+
+    try:
+        with open(source, "rb") as src, open(partial, "wb") as dst:
+            offset = 0
+            while offset < size:
+                count = min(CHUNK, size - offset)
+                if (copied := _copy_chunk(src.fileno(), dst.fileno(), offset, count)) == 0:
+                    break
+                offset += copied
+
+                # bandwidth cap, sleep until the average rate is back under the limit
+                if (ahead := offset / bytes_per_sec - (monotonic() - started)) > 0:
+                    sleep(ahead)
+
+            os.fsync(dst.fileno())
+
+        if partial.stat().st_size != size:
+            raise OSError(f"Incomplete copy of {source.name}")
+
+        # fsync the rename before the staged copy is removed
+        partial.rename(target)
+    except Exception:
+        # ENOSPC or EIO mid copy, no half written file is left on the archive
+        partial.unlink(missing_ok=True)
+        raise
+
+    directory = os.open(target.parent, os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+    source.unlink()
+
+
+@dataclass(slots=True)
+class TierMover:
+    """Move finished captures from the staging volume to the bulk mounts"""
+
+    queue: Queue[tuple[str, Path]] = field(default_factory=Queue)
+    thread: Thread = field(init=False)
+
+    def __post_init__(self):
+        self.thread = Thread(target=self.run, name="tier_mover", daemon=True)
+        self.thread.start()
+
+    def submit(self, name_: str, file: Path) -> None:
+        staging = get_allocator().staging
+        if staging is None or staging not in file.parents:
+            return None
+        self.queue.put((name_, file))
+
+    def run(self) -> None:
+        while True:
+            name_, file = self.queue.get()
+            try:
+                self.move(name_, file)
+            except OSError as error:
+                log.error(error)
+            finally:
+                self.queue.task_done()
+
+    def move(self, name_: str, file: Path) -> None:
+        allocator = get_allocator()
+        if allocator.staging is None or not file.exists():
+            return None
+
+        if (mount := allocator.archive_mount()) is None:
+            log.error(colored(f"No archive mount has room for {file.name}", "red"))
+            return None
+
+        target = Path(mount, file.relative_to(allocator.staging))
+        move_file(file, target, config.archive_mb_per_sec * 1024**2)
+        db_update_storage(name_, storage_label(mount))
+        log.info(
+            f"{strftime("%H:%M:%S")}: Archived {colored(file.name, "green")} to {mount}"
+        )
+
+
+@lru_cache()
+def get_mover() -> TierMover:
+    return TierMover()
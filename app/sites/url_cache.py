@@ -0,0 +1,97 @@
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from functools import lru_cache
+from random import choice
+from string import ascii_lowercase, digits
+from threading import Lock
+from time import monotonic
+
+from app.config.settings import get_settings
+from app.utils.named_tuples import HlsQueryResults
+
+config = get_settings()
+
+Lookup = Future[HlsQueryResults]
+
+
+def random_str() -> str:
+    letters = f"{ascii_lowercase}{digits}"
+    return "-sd-" + "".join(choice(letters) for _ in range(64)) + "_trns_h264"
+
+
+def generate_url(name_: str, domain: str) -> str:
+    random_string = random_str()
+    return f"https://{domain}/live-hls/amlst:{name_}{random_string}/playlist.m3u8"
+
+
+@dataclass(slots=True)
+class EdgeUrlCache:
+    """TTL cache of resolved edge urls with single flight lookups.
+
+    Futures are concurrent.futures so callers on any thread or event loop
+    can wait on a lookup another caller already started.
+    """
+
+    ttl: float
+    entries: dict[str, tuple[float, HlsQueryResults]] = field(default_factory=dict)
+    domains: dict[str, str] = field(default_factory=dict)
+    inflight: dict[str, Lookup] = field(default_factory=dict)
+    lock: Lock = field(default_factory=Lock)
+    hits: int = 0
+    misses: int = 0
+
+    def get(self, name_: str) -> HlsQueryResults | None:
+        with self.lock:
+            if (entry := self.entries.get(name_)) is None:
+                return None
+
+            stored, result = entry
+            if monotonic() - stored > self.ttl:
+                del self.entries[name_]
+                return None
+
+            self.hits += 1
+            return result
+
+    def domain(self, name_: str) -> str | None:
+        with self.lock:
+            return self.domains.get(name_)
+
+    def put(self, result: HlsQueryResults) -> None:
+        with self.lock:
+            if result.domain:
+                self.domains[result.name_] = result.domain
+            if result.success and result.url:
+                self.entries[result.name_] = (monotonic(), result)
+
+    def invalidate(self, name_: str) -> None:
+        with self.lock:
+            self.entries.pop(name_, None)
+
+    def claim(self, names: list[str]) -> tuple[dict[str, Lookup], dict[str, Lookup]]:
+        """Split names into lookups this caller owns and ones already in flight"""
+        owned: dict[str, Lookup] = {}
+        waiting: dict[str, Lookup] = {}
+        with self.lock:
+            for name_ in names:
+                if (future := self.inflight.get(name_)) is not None:
+                    waiting[name_] = future
+                    continue
+                owned[name_] = self.inflight[name_] = Future()
+            self.misses += len(owned)
+        return owned, waiting
+
+    def finish(self, owned: dict[str, Lookup], results: list[HlsQueryResults]) -> None:
+        found = {x.name_: x for x in results}
+        for result in results:
+            self.put(result)
+
+        with self.lock:
+            for name_, future in owned.items():
+                self.inflight.pop(name_, None)
+                future.set_result(found.get(name_, HlsQueryResults(name_)))
+
+
+@lru_cache()
+def get_url_cache() -> EdgeUrlCache:
+    return EdgeUrlCache(config.edge_url_ttl)
@@ -1,21 +1,16 @@
-import asyncio
 import os
 import sys
 from cmd import Cmd
 from logging import getLogger
 from signal import SIGTERM
-from time import sleep
 
-from tabulate import tabulate
 from termcolor import colored
 
 import app.database.db_query as dbase
 from app.database.db_writes import block_capture, db_add_streamer, stop_capturing
-from app.sites.capture_streamer import CaptureStreamer
 from app.sites.create_streamer import CreateStreamer
-from app.sites.getstreamerurl import get_streamer_url
 from app.ui.clivalidations import CliValidations
-from app.utils.general_utils import recent_api_call
+from app.utils.general_utils import format_epoch
 from app.utils.named_tuples import HlsQueryResults
 
 log = getLogger(__name__)
@@ -54,7 +49,14 @@ class Cli(Cmd, CliValidations):
         if data.name_ is None:
             return None
 
-        streamers: list[HlsQueryResults] = asyncio.run(get_streamer_url([data.name_]))
+        # httpx and the capture modules load on first use, not at startup
+        from app.sites.capture_streamer import CaptureStreamer
+        from app.sites.capture_supervisor import get_supervisor
+        from app.sites.getstreamerurl import resolve_streamer_urls
+
+        streamers: list[HlsQueryResults] = get_supervisor().run_sync(
+            resolve_streamer_urls([data.name_])
+        )
         streamer = streamers[0]
 
         if not streamer.success:
@@ -69,11 +71,6 @@ class Cli(Cmd, CliValidations):
 
         db_add_streamer(streamer.name_, streamer.domain)
 
-        if recent_api_call():
-            log.info(colored("Awaiting api rest cmd get", "yellow"))
-            sleep(60)
-            log.debug("resuming api call")
-
         if not None in (dbase.db_get_pid(streamer.name_)):
             log.info(
                 f"Already capturing {colored(streamer.name_,"yellow")} from {data.site}"
@@ -104,13 +101,30 @@ class Cli(Cmd, CliValidations):
             print("Presently capturing zero streamers")
             return None
 
-        head = ["Streamers", "Capturing", "# Caps"]
+        from tabulate import tabulate
+
+        from app.sites.capture_supervisor import get_supervisor
+
+        supervisor = get_supervisor()
+        rows = []
+        for name_, follow, recorded in query:
+            follow = format_epoch(follow)
+            if (stats := supervisor.stats(name_)) is None:
+                rows.append((name_, follow, recorded, "-", "-", "-"))
+                continue
+
+            stalled = colored("stalled", "red") if stats.stalled else "ok"
+            rows.append(
+                (name_, follow, recorded, f"{stats.kbps}", f"{stats.speed}x", stalled)
+            )
+
+        head = ["Streamers", "Capturing", "# Caps", "kbit/s", "Speed", "Status"]
         print(
             tabulate(
-                query,
+                rows,
                 headers=head,
                 tablefmt="pretty",
-                colalign=("left", "center", "center"),
+                colalign=("left", "center", "center", "right", "right", "center"),
             )
         )
 
@@ -123,10 +137,13 @@ class Cli(Cmd, CliValidations):
             print("Following zero streamers")
             return None
 
+        from tabulate import tabulate
+
         head = ["Streamers", "Recent Stream", "# Caps"]
+        rows = [(x, format_epoch(last), recorded) for x, last, recorded in query]
         print(
             tabulate(
-                query,
+                rows,
                 headers=head,
                 tablefmt="pretty",
                 colalign=("left", "center", "center"),
@@ -145,6 +162,13 @@ class Cli(Cmd, CliValidations):
 
         name_, pid = pid
 
+        from app.sites.capture_supervisor import get_supervisor
+
+        # native captures record the app's own pid, never signal it
+        if get_supervisor().stop(name_) or pid == os.getpid():
+            stop_capturing(name_)
+            return None
+
         try:
             os.kill(pid, SIGTERM)
         except OSError as error:
@@ -0,0 +1,145 @@
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable, Hashable, Iterable
+from dataclasses import dataclass, field
+from functools import lru_cache
+from logging import Logger
+from random import uniform
+from time import perf_counter
+from typing import TypeVar
+
+from httpx import TransportError
+
+from app.config.settings import get_settings
+from app.utils.http_clients import REQUEST_SENT
+
+config = get_settings()
+
+T = TypeVar("T")
+
+# connect errors, read timeouts and dropped streams are worth another attempt
+RETRYABLE = (TransportError,)
+
+
+@dataclass(slots=True)
+class BatchReport:
+    """Outcome of a batch, completed requests are kept even when others fail"""
+
+    errors: dict[Hashable, str] = field(default_factory=dict)
+    completed: int = 0
+    retries: int = 0
+    hedged: int = 0
+
+    def failed(self, key: Hashable, error: BaseException) -> None:
+        self.errors[key] = f"{type(error).__name__}: {error}"
+
+    def summary(self) -> str:
+        text = f"{self.completed} ok, {len(self.errors)} failed"
+        if self.retries or self.hedged:
+            text += f", {self.retries} retries, {self.hedged} hedged"
+        return text
+
+    def log_errors(self, log: Logger, label: str) -> None:
+        for key, error in self.errors.items():
+            log.debug(f"{label} {key}: {error}")
+
+
+@dataclass(slots=True)
+class Hedge:
+    """Latency window of one call site, a duplicate fires past the quantile"""
+
+    quantile: float
+    min_samples: int = 20
+    floor: float = 0.5
+    samples: deque[float] = field(default_factory=lambda: deque(maxlen=200))
+
+    def delay(self) -> float | None:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return max(self.floor, ordered[int((len(ordered) - 1) * self.quantile)])
+
+
+@lru_cache(maxsize=None)
+def get_hedge(site: str) -> Hedge:
+    return Hedge(config.hedge_quantile)
+
+
+async def hedged(
+    call: Callable[[], Awaitable[T]], hedge: Hedge | None, report: BatchReport
+) -> T:
+    sent = asyncio.Event()
+    token = REQUEST_SENT.set(sent)
+    try:
+        tasks = {asyncio.ensure_future(call())}
+    finally:
+        REQUEST_SENT.reset(token)
+
+    try:
+        start_ = perf_counter()
+        if hedge is not None:
+            # time queued behind the rate limiter is not slowness, the clock starts once sent
+            waiter = asyncio.ensure_future(sent.wait())
+            await asyncio.wait({*tasks, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            start_ = perf_counter()
+
+        if hedge is not None and (delay := hedge.delay()) is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                report.hedged += 1
+                tasks.add(asyncio.ensure_future(call()))
+
+        # first success wins, an error only counts once every copy has failed
+        error: BaseException | None = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if (error := task.exception()) is None:
+                    if hedge is not None:
+                        hedge.samples.append(perf_counter() - start_)
+                    return task.result()
+        raise error  # type: ignore
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def attempt(
+    call: Callable[[], Awaitable[T]], hedge: Hedge | None, report: BatchReport
+) -> T:
+    n = 0
+    while True:
+        try:
+            return await hedged(call, hedge, report)
+        except RETRYABLE:
+            if n >= config.retry_attempts:
+                raise
+            report.retries += 1
+            # full jitter keeps retries from a failed burst spread out
+            await asyncio.sleep(uniform(0, config.retry_base_delay * 2**n))
+            n += 1
+
+
+async def run_batch(
+    keys: Iterable[Hashable],
+    call: Callable[[Hashable], Awaitable[T]],
+    hedge: Hedge | None = None,
+) -> tuple[list[T], BatchReport]:
+    """Run one request per key, failures are reported per key and never cancel the rest"""
+    report = BatchReport()
+
+    async def one(key: Hashable) -> T | None:
+        try:
+            result = await attempt(lambda: call(key), hedge, report)
+        except Exception as error:
+            report.failed(key, error)
+            return None
+        report.completed += 1
+        return result
+
+    async with asyncio.TaskGroup() as group:
+        tasks = [group.create_task(one(key)) for key in keys]
+
+    results = [x for task in tasks if (x := task.result()) is not None]
+    return (results, report)
@@ -121,6 +121,15 @@ HEADERS_IMG = {
     "Sec-fetch-site": "none",
 }
 
+HEADERS_HLS = {
+    "User-agent": choice(USERAGENTS),
+    "Accept": "*/*",
+    "Accept-encoding": "gzip, deflate, br",
+    "Accept-language": "en-US,en;q=0.9",
+    "Origin": "https://chaturbate.com",
+    "Referer": "https://chaturbate.com/",
+}
+
 referers = (
     "https://www.google.com",
     "https://www.google.ca",
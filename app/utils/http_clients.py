@@ -0,0 +1,87 @@
+import asyncio
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from threading import Lock
+from time import monotonic
+
+from httpx import AsyncClient, Limits, Request, Response
+
+from app.config.settings import get_settings
+from app.utils.constants import HEADERS_HLS, HEADERS_IMG, HEADERS_JSON, HEADERS_STREAM_URL
+from app.utils.rate_limit import get_limiter
+
+config = get_settings()
+
+PROFILES: dict[str, dict[str, str]] = {
+    "json": HEADERS_JSON,
+    "stream_url": HEADERS_STREAM_URL,
+    "img": HEADERS_IMG,
+    "hls": HEADERS_HLS,
+}
+
+# set around a call whose send time matters, the request hook fires it once
+# a rate limiter token is granted and the request actually goes out
+REQUEST_SENT: ContextVar[asyncio.Event | None] = ContextVar("request_sent", default=None)
+
+
+async def _limit_request(request: Request) -> None:
+    if (limiter := get_limiter(request.url.host)) is not None:
+        await limiter.acquire()
+    request.extensions["sent"] = monotonic()
+    if (sent := REQUEST_SENT.get()) is not None:
+        sent.set()
+
+
+async def _limit_response(response: Response) -> None:
+    request = response.request
+    if (limiter := get_limiter(request.url.host)) is not None:
+        limiter.record(response.status_code, monotonic() - request.extensions.get("sent", monotonic()))
+
+
+@dataclass(slots=True)
+class ClientRegistry:
+    """Long lived HTTP/2 clients, one per event loop and header profile.
+
+    httpx clients are bound to the loop that opened their connections, so
+    each long running loop (online status, capture supervisor) gets its own.
+    """
+
+    clients: dict[tuple[int, str], AsyncClient] = field(default_factory=dict)
+    lock: Lock = field(default_factory=Lock)
+
+    def get(self, profile: str) -> AsyncClient:
+        key = (id(asyncio.get_running_loop()), profile)
+        with self.lock:
+            if (client := self.clients.get(key)) is None or client.is_closed:
+                client = self.clients[key] = AsyncClient(
+                    headers=PROFILES[profile],
+                    http2=True,
+                    event_hooks={
+                        "request": [_limit_request],
+                        "response": [_limit_response],
+                    },
+                    limits=Limits(
+                        max_connections=config.http_max_connections,
+                        max_keepalive_connections=config.http_max_keepalive,
+                        keepalive_expiry=config.http_keepalive_expiry,
+                    ),
+                )
+            return client
+
+    async def aclose(self) -> None:
+        loop_id = id(asyncio.get_running_loop())
+        with self.lock:
+            closing = [k for k in self.clients if k[0] == loop_id]
+            clients = [self.clients.pop(k) for k in closing]
+        for client in clients:
+            await client.aclose()
+
+
+@lru_cache()
+def get_registry() -> ClientRegistry:
+    return ClientRegistry()
+
+
+def get_client(profile: str) -> AsyncClient:
+    return get_registry().get(profile)
@@ -37,3 +37,46 @@ class StreamerWithPid(NamedTuple):
     pid: int
     streamer_name: str
     site_name: str
+
+
+class ProgressSample(NamedTuple):
+    wall: float
+    frame: int
+    fps: float
+    bitrate: float
+    total_size: int
+    out_time_us: int
+    drop_frames: int
+    speed: float
+    progress: str
+
+
+class CaptureStats(NamedTuple):
+    kbps: float
+    speed: float
+    drop_frames: int
+    stalled: bool
+
+
+class HlsVariant(NamedTuple):
+    url: str
+    bandwidth: int = 0
+    height: int = 0
+
+
+class HlsMediaPlaylist(NamedTuple):
+    sequence: int
+    segments: list[tuple[str, float]]
+    target_duration: float
+    ended: bool
+
+
+class Admission(NamedTuple):
+    admitted: bool
+    evict: str | None = None
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    statements: list[str]
@@ -0,0 +1,57 @@
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from functools import lru_cache
+from threading import Lock
+from time import monotonic
+
+from app.config.settings import get_settings
+
+config = get_settings()
+
+
+@dataclass(slots=True)
+class OnlineIndex:
+    """Streamers seen in the roomlist scrape, filled page by page"""
+
+    ttl: float
+    seen: dict[str, float] = field(default_factory=dict)
+    listeners: list[Callable[[set[str]], None]] = field(default_factory=list)
+    lock: Lock = field(default_factory=Lock)
+
+    def add_page(self, names: Iterable[str]) -> None:
+        now = monotonic()
+        page = set(names)
+        with self.lock:
+            for name_ in page:
+                self.seen[name_] = now
+            listeners = list(self.listeners)
+
+        for listener in listeners:
+            listener(page)
+
+    def is_online(self, name_: str) -> bool:
+        with self.lock:
+            seen = self.seen.get(name_)
+        return seen is not None and monotonic() - seen <= self.ttl
+
+    def split(self, names: list[str]) -> tuple[list[str], list[str]]:
+        """Names found in the latest scrape, and names that still need a probe"""
+        online: list[str] = []
+        unknown: list[str] = []
+        for name_ in names:
+            (online if self.is_online(name_) else unknown).append(name_)
+        return (online, unknown)
+
+    def prune(self) -> None:
+        cutoff = monotonic() - self.ttl
+        with self.lock:
+            self.seen = {k: v for k, v in self.seen.items() if v >= cutoff}
+
+    def subscribe(self, listener: Callable[[set[str]], None]) -> None:
+        with self.lock:
+            self.listeners.append(listener)
+
+
+@lru_cache()
+def get_online_index() -> OnlineIndex:
+    return OnlineIndex(config.online_index_ttl)
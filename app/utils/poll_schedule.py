@@ -0,0 +1,97 @@
+import heapq
+from dataclasses import dataclass, field
+from functools import lru_cache
+from math import log10
+from random import uniform
+from threading import Lock
+from time import monotonic, time
+
+from app.config.settings import get_settings
+
+config = get_settings()
+
+
+def poll_interval(
+    last_broadcast: int | None, recorded: int | None, low: float, high: float
+) -> float:
+    # recent and frequent broadcasters stay near the floor, dormant ones drift to high
+    if last_broadcast is None:
+        return high
+
+    hours = max(0.0, (time() - last_broadcast) / 3600)
+    interval = low * (1 + hours) / (1 + log10(1 + (recorded or 0)))
+    return min(high, max(low, interval))
+
+
+@dataclass(slots=True)
+class PollScheduler:
+    """Next check time per followed streamer, popped as a rolling sweep.
+
+    The heap uses lazy deletion, due_at holds the live entry for each name.
+    """
+
+    low: float
+    high: float
+    heap: list[tuple[float, str]] = field(default_factory=list)
+    due_at: dict[str, float] = field(default_factory=dict)
+    intervals: dict[str, float] = field(default_factory=dict)
+    focused: dict[str, float] = field(default_factory=dict)
+    lock: Lock = field(default_factory=Lock)
+
+    def sync(self, rows: list[tuple[str, int | None, int | None]]) -> None:
+        """Refresh intervals from the db, new names land at a random point of theirs"""
+        now = monotonic()
+        with self.lock:
+            names = set()
+            for name_, last_broadcast, recorded in rows:
+                names.add(name_)
+                interval = poll_interval(last_broadcast, recorded, self.low, self.high)
+                self.intervals[name_] = interval
+                if name_ not in self.due_at:
+                    self._push(name_, now + uniform(0, interval))
+
+            for name_ in set(self.due_at) - names:
+                del self.due_at[name_]
+                self.intervals.pop(name_, None)
+
+    def _push(self, name_: str, at: float) -> None:
+        self.due_at[name_] = at
+        heapq.heappush(self.heap, (at, name_))
+
+    def pop_due(self) -> list[str]:
+        now = monotonic()
+        due: list[str] = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                at, name_ = heapq.heappop(self.heap)
+                if self.due_at.get(name_) != at:
+                    continue
+                due.append(name_)
+                # jitter keeps neighbours from lining up into a burst again
+                interval = self.intervals.get(name_, self.high)
+                if self.focused.get(name_, 0) > now:
+                    interval = self.low
+                self._push(name_, now + interval * uniform(0.9, 1.1))
+        return due
+
+    def boost(self, name_: str, at: float) -> None:
+        """Check a streamer no later than at (monotonic)"""
+        with self.lock:
+            if name_ in self.due_at and self.due_at[name_] > at:
+                self._push(name_, at)
+
+    def focus(self, name_: str, start: float, until: float) -> None:
+        """Poll at the floor interval from start until until (monotonic)"""
+        with self.lock:
+            self.focused = {k: v for k, v in self.focused.items() if v > monotonic()}
+            self.focused[name_] = until
+        self.boost(name_, start)
+
+    def rate(self) -> float:
+        with self.lock:
+            return sum(1 / x for x in self.intervals.values())
+
+
+@lru_cache()
+def get_poll_scheduler() -> PollScheduler:
+    return PollScheduler(config.poll_min_interval, config.poll_max_interval)
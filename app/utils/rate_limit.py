@@ -0,0 +1,111 @@
+import asyncio
+import math
+from dataclasses import dataclass, field
+from functools import lru_cache
+from logging import getLogger
+from threading import Lock
+from time import monotonic, strftime
+
+from termcolor import colored
+
+from app.config.settings import get_settings
+
+log = getLogger(__name__)
+config = get_settings()
+
+
+@dataclass(slots=True)
+class HostLimiter:
+    """Token bucket for one upstream host, tuned by AIMD from 429s and latency.
+
+    Shared by every thread and event loop, waits are computed under a lock
+    and slept outside it.
+    """
+
+    host: str
+    rate: float
+    min_rate: float
+    max_rate: float
+    burst: float = 5.0
+    latency_target: float = 2.0
+    tokens: float = field(init=False)
+    updated: float = field(init=False)
+    latency: float = field(default=0.0, init=False)
+    throttled: int = field(default=0, init=False)
+    decreased: float = field(default=-math.inf, init=False)
+    lock: Lock = field(default_factory=Lock)
+
+    def __post_init__(self):
+        self.tokens = self.burst
+        self.updated = monotonic()
+
+    def reserve(self) -> float:
+        with self.lock:
+            now = monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    async def acquire(self) -> None:
+        if (delay := self.reserve()) > 0:
+            await asyncio.sleep(delay)
+
+    def decrease(self, factor: float, sent: float) -> bool:
+        # one cut per congestion event, responses to requests sent before
+        # the last cut were already in flight and belong to the same event
+        if sent < self.decreased:
+            return False
+        self.rate = max(self.min_rate, self.rate * factor)
+        self.decreased = monotonic()
+        return True
+
+    def record(self, status_code: int, elapsed: float) -> None:
+        with self.lock:
+            self.latency = elapsed if not self.latency else 0.8 * self.latency + 0.2 * elapsed
+            sent = monotonic() - elapsed
+
+            if status_code == 429:
+                # multiplicative decrease, drain the bucket so queued callers back off
+                self.tokens = min(self.tokens, 0.0)
+                self.throttled += 1
+                if self.decrease(0.5, sent):
+                    log.info(
+                        f"{strftime("%H:%M:%S")}: {colored(self.host, "yellow")} rate limited, {round(self.rate, 2)} req/s"
+                    )
+                return None
+
+            if self.latency > self.latency_target:
+                self.decrease(0.9, sent)
+                return None
+
+            # additive increase, about one request per second per second
+            self.rate = min(self.max_rate, self.rate + 1 / max(self.rate, 1.0))
+
+
+@dataclass(slots=True)
+class RateLimits:
+    limiters: dict[str, HostLimiter] = field(default_factory=dict)
+    lock: Lock = field(default_factory=Lock)
+
+    def get(self, host: str) -> HostLimiter | None:
+        if (rate := config.rate_limits.get(host)) is None:
+            return None
+
+        with self.lock:
+            if (limiter := self.limiters.get(host)) is None:
+                limiter = self.limiters[host] = HostLimiter(
+                    host, rate, min_rate=rate / 10, max_rate=rate * 5
+                )
+            return limiter
+
+
+@lru_cache()
+def get_rate_limits() -> RateLimits:
+    return RateLimits()
+
+
+def get_limiter(host: str) -> HostLimiter | None:
+    return get_rate_limits().get(host)
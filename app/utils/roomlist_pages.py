@@ -0,0 +1,118 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from threading import Lock
+
+from app.config.settings import get_settings
+
+config = get_settings()
+
+PAGE_SIZE = 90
+
+
+def fingerprint(rows: list[tuple[str, int, int]]) -> int:
+    # viewer counts are bucketed so small swings don't read as a change
+    return hash(tuple(sorted((name_, users // 25) for name_, _, users in rows)))
+
+
+@dataclass(slots=True)
+class PageState:
+    fingerprint: int
+    rooms: frozenset[str]
+    churn: float
+    cycle: int
+
+
+@dataclass(slots=True)
+class RoomlistPages:
+    """Per offset fingerprints of the roomlist, used to skip stable pages.
+
+    Churn is a moving average of how much a page's room set changed between
+    fetches. Top pages and high churn pages are fetched every cycle, stable
+    tail pages back off up to max_skip cycles.
+    """
+
+    top_pages: int
+    max_skip: int
+    pages: dict[int, PageState] = field(default_factory=dict)
+    cycle: int = 0
+    end: int | None = None
+    fetched: int = 0
+    changed: int = 0
+    lock: Lock = field(default_factory=Lock)
+
+    def start_cycle(self) -> None:
+        with self.lock:
+            self.cycle += 1
+            self.end = None
+            self.fetched = 0
+            self.changed = 0
+
+    def interval(self, state: PageState) -> int:
+        if state.churn >= 0.5:
+            return 1
+        if state.churn >= 0.2:
+            return min(2, self.max_skip)
+        return self.max_skip
+
+    def due(self, offset: int) -> bool:
+        with self.lock:
+            if offset < self.top_pages * PAGE_SIZE:
+                return True
+            if (state := self.pages.get(offset)) is None:
+                return True
+            return self.cycle - state.cycle >= self.interval(state)
+
+    def cached(self, offsets: list[int]) -> set[str]:
+        """Rooms last seen on pages skipped this cycle"""
+        with self.lock:
+            return {
+                x
+                for offset in offsets
+                if (state := self.pages.get(offset)) is not None
+                and (self.end is None or offset < self.end)
+                for x in state.rooms
+            }
+
+    def past_end(self, offset: int) -> bool:
+        with self.lock:
+            return self.end is not None and offset >= self.end
+
+    def record(self, offset: int, rows: list[tuple[str, int, int]] | None) -> bool:
+        """Store a fetched page, returns True when it differs from the last fetch"""
+        # a failed fetch is unknown, not empty, the page stays due and the end unset
+        if rows is None:
+            return False
+
+        with self.lock:
+            self.fetched += 1
+
+            # a short or empty page marks the end of the list for this cycle
+            if len(rows) < PAGE_SIZE:
+                end = offset + PAGE_SIZE if rows else offset
+                self.end = end if self.end is None else min(self.end, end)
+                self.pages = {k: v for k, v in self.pages.items() if k < self.end}
+                if not rows:
+                    return False
+
+            rooms = frozenset(x[0] for x in rows)
+            current = fingerprint(rows)
+            if (state := self.pages.get(offset)) is None:
+                self.pages[offset] = PageState(current, rooms, 1.0, self.cycle)
+                self.changed += 1
+                return True
+
+            change = 0.0
+            if current != state.fingerprint:
+                # jaccard distance, floored so count-only changes still register
+                change = max(0.1, 1 - len(rooms & state.rooms) / len(rooms | state.rooms))
+                self.changed += 1
+
+            self.pages[offset] = PageState(
+                current, rooms, 0.5 * state.churn + 0.5 * change, self.cycle
+            )
+            return change > 0
+
+
+@lru_cache()
+def get_roomlist_pages() -> RoomlistPages:
+    return RoomlistPages(config.roomlist_top_pages, config.roomlist_max_skip)
@@ -0,0 +1,73 @@
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import lru_cache
+from threading import Lock
+from time import time
+
+from app.config.settings import get_settings
+
+config = get_settings()
+
+
+@dataclass(slots=True)
+class OpenSession:
+    started: int
+    ended: int
+    peak: int
+
+
+@dataclass(slots=True)
+class SessionHistory:
+    """Broadcast sessions of followed streamers, built from every sighting.
+
+    A sighting within gap seconds of the last one extends the open session,
+    a later one starts a new session. Rows are upserted on flush.
+    """
+
+    gap: int
+    watched: set[str] = field(default_factory=set)
+    sessions: dict[str, OpenSession] = field(default_factory=dict)
+    dirty: set[str] = field(default_factory=set)
+    lock: Lock = field(default_factory=Lock)
+
+    def watch(self, names: Iterable[str]) -> None:
+        with self.lock:
+            self.watched = set(names)
+
+    def load(self, rows: list[tuple[str, int, int, int]]) -> None:
+        # sessions still open when the app stopped carry on after a restart
+        with self.lock:
+            for name_, started, ended, peak in rows:
+                self.sessions[name_] = OpenSession(started, ended, peak or 0)
+
+    def observe(self, sightings: Iterable[tuple[str, int | None]]) -> None:
+        now = int(time())
+        with self.lock:
+            for name_, viewers in sightings:
+                if name_ not in self.watched:
+                    continue
+
+                session = self.sessions.get(name_)
+                if session is None or now - session.ended > self.gap:
+                    session = self.sessions[name_] = OpenSession(now, now, 0)
+
+                session.ended = now
+                session.peak = max(session.peak, viewers or 0)
+                self.dirty.add(name_)
+
+    def flush(self) -> list[tuple[str, int, int, int]]:
+        """Rows to upsert, sessions past the gap are dropped once written"""
+        cutoff = int(time()) - self.gap
+        with self.lock:
+            rows = [
+                (x, self.sessions[x].started, self.sessions[x].ended, self.sessions[x].peak)
+                for x in self.dirty
+            ]
+            self.dirty.clear()
+            self.sessions = {k: v for k, v in self.sessions.items() if v.ended >= cutoff}
+        return rows
+
+
+@lru_cache()
+def get_session_history() -> SessionHistory:
+    return SessionHistory(config.history_gap_seconds)
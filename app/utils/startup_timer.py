@@ -0,0 +1,29 @@
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from logging import getLogger
+from time import perf_counter
+
+from termcolor import colored
+
+log = getLogger(__name__)
+
+
+@dataclass(slots=True)
+class StartupTimer:
+    """Wall time of each startup phase, reported once the cli is up"""
+
+    phases: list[tuple[str, float]] = field(default_factory=list)
+    started: float = field(default_factory=perf_counter)
+
+    @contextmanager
+    def phase(self, name: str):
+        start_ = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, perf_counter() - start_))
+
+    def report(self) -> None:
+        total = perf_counter() - self.started
+        breakdown = ", ".join(f"{name} {round(x * 1000)}ms" for name, x in self.phases)
+        log.info(f"Startup {colored(f"{round(total * 1000)}ms", "green")}: {breakdown}")
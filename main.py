@@ -1,13 +1,32 @@
 from threading import Thread
-from app.database.create_db import db_init
+
+from app.database.create_db import check_ghost_process, db_init
+from app.database.maintenance import get_maintenance
 from app.log.logger import init_logging
-from app.online_status import run_online_status
 from app.ui.commandline import Cli
+from app.utils.startup_timer import StartupTimer
+
+
+def start_online_status() -> None:
+    # httpx and the scrape modules load here, off the startup path
+    from app.online_status import run_online_status
+
+    run_online_status()
 
 
 if __name__ == "__main__":
-    init_logging()
-    db_init()
-    thread =Thread(target=run_online_status, daemon=True)
-    thread.start()
-    Cli().cmdloop()
+    # import cost is left to python -X importtime, the timer starts after them
+    timer = StartupTimer()
+    with timer.phase("logging"):
+        init_logging()
+    with timer.phase("database"):
+        db_init()
+    with timer.phase("ghost_pids"):
+        check_ghost_process()
+    with timer.phase("threads"):
+        get_maintenance()
+        thread = Thread(target=start_online_status, daemon=True)
+        thread.start()
+    cli = Cli()
+    timer.report()
+    cli.cmdloop()
@@ -0,0 +1,18 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from app.database.pool import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path: Path):
+    path = Path(tmp_path, "test.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE items (name TEXT PRIMARY KEY, num_ INTEGER)")
+    conn.close()
+
+    pool = ConnectionPool(path)
+    yield pool
+    pool.close()
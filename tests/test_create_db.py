@@ -0,0 +1,43 @@
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+from app.database import create_db
+from app.database.migrations import MIGRATIONS
+
+SCHEMA_V0 = Path(Path(__file__).parent, "data", "schema_v0.sql")
+
+
+@pytest.fixture
+def db_path(tmp_path: Path, monkeypatch) -> Path:
+    path = Path(tmp_path, "db", "init.sqlite3")
+    monkeypatch.setattr(create_db, "DB_PATH", path)
+    return path
+
+
+def pragmas(path: Path) -> tuple[int, int, str]:
+    with closing(sqlite3.connect(path)) as conn:
+        return (
+            conn.execute("PRAGMA auto_vacuum").fetchone()[0],
+            conn.execute("PRAGMA user_version").fetchone()[0],
+            conn.execute("PRAGMA journal_mode").fetchone()[0],
+        )
+
+
+def test_new_database_is_incremental_and_current(db_path: Path):
+    create_db.db_init()
+
+    assert pragmas(db_path) == (2, MIGRATIONS[-1].version, "wal")
+
+
+def test_older_database_is_converted_once_at_startup(db_path: Path):
+    db_path.parent.mkdir()
+    with closing(sqlite3.connect(db_path)) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA_V0.read_text(encoding="utf-8"))
+
+    create_db.db_init()
+
+    assert pragmas(db_path) == (2, MIGRATIONS[-1].version, "wal")
@@ -0,0 +1,81 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.database import db_writer
+from app.database.db_writer import DbWriter
+
+INSERT = "INSERT INTO items (name, num_) VALUES (?, ?)"
+
+
+@pytest.fixture
+def writer(pool, monkeypatch):
+    monkeypatch.setattr(db_writer, "get_pool", lambda: pool)
+    return DbWriter(0.005)
+
+
+def count(pool) -> int:
+    with pool.read() as cursor:
+        return cursor.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+
+def test_group_commit(writer, pool):
+    futures = [writer.submit(INSERT, (f"name_{x}", x)) for x in range(50)]
+    assert all(x.result(timeout=5) for x in futures)
+    assert count(pool) == 50
+
+
+def test_failed_write_only_rolls_back_itself(writer, pool):
+    ok = writer.submit(INSERT, ("a", 1))
+    duplicate = writer.submit(INSERT, ("a", 2))
+    group = writer.submit_group([(INSERT, ("b", 1), False), (INSERT, ("a", 3), False)])
+
+    assert ok.result(timeout=5)
+    with pytest.raises(sqlite3.IntegrityError):
+        duplicate.result(timeout=5)
+    with pytest.raises(sqlite3.IntegrityError):
+        group.result(timeout=5)
+    assert count(pool) == 1
+
+
+def test_bad_value_fails_the_write_not_the_thread(writer, pool):
+    with pytest.raises(OverflowError):
+        writer.submit(INSERT, ("big", 2**70)).result(timeout=5)
+
+    assert writer.submit(INSERT, ("small", 1)).result(timeout=5)
+    assert writer.thread.is_alive()
+    assert count(pool) == 1
+
+
+def test_unexpected_error_fails_the_batch_not_the_thread(writer, pool, monkeypatch):
+    def broken(self, request):
+        raise RuntimeError("broken")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(DbWriter, "apply", broken)
+        with pytest.raises(RuntimeError):
+            writer.submit(INSERT, ("a", 1)).result(timeout=5)
+
+    assert writer.thread.is_alive()
+    assert writer.submit(INSERT, ("b", 1)).result(timeout=5)
+    assert count(pool) == 1
+
+
+def test_cancelled_write_is_skipped(writer, pool):
+    request = db_writer.WriteRequest([(INSERT, ("a", 1), False)])
+    request.future.cancel()
+    writer.queue.put(request)
+
+    assert writer.submit(INSERT, ("b", 1)).result(timeout=5)
+    assert count(pool) == 1
+
+
+def test_get_writer_is_shared_across_threads(pool, monkeypatch):
+    monkeypatch.setattr(db_writer, "get_pool", lambda: pool)
+    monkeypatch.setattr(db_writer, "_writer", None)
+
+    with ThreadPoolExecutor(8) as executor:
+        futures = [executor.submit(db_writer.get_writer) for _ in range(8)]
+
+    assert len({id(x.result()) for x in futures}) == 1
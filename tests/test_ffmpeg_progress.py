@@ -0,0 +1,66 @@
+from threading import Event, Thread
+
+from app.sites.ffmpeg_progress import ProgressTracker
+from app.utils.named_tuples import ProgressSample
+
+
+def sample(wall: float, out_time_us: int, total_size: int = 0) -> ProgressSample:
+    return ProgressSample(wall, 0, 30.0, 2000.0, total_size, out_time_us, 0, 1.0, "continue")
+
+
+def feed(tracker: ProgressTracker, seconds: float, frozen_after: float) -> None:
+    # one block per progress period, out_time stops advancing at frozen_after
+    for x in range(int(seconds / tracker.period)):
+        wall = x * tracker.period
+        tracker.samples.append(sample(wall, int(min(wall, frozen_after) * 1e6)))
+
+
+def test_ring_covers_the_stall_window():
+    tracker = ProgressTracker("name_")
+    assert tracker.samples.maxlen is not None
+    assert tracker.samples.maxlen * tracker.period > tracker.stall_seconds
+
+
+def test_frozen_out_time_is_a_stall():
+    tracker = ProgressTracker("name_")
+    feed(tracker, 60, frozen_after=30)
+
+    last = tracker.samples[-1].wall
+    assert tracker.stalled(now=last)
+
+
+def test_advancing_out_time_is_not_a_stall():
+    tracker = ProgressTracker("name_")
+    feed(tracker, 60, frozen_after=60)
+
+    assert not tracker.stalled(now=tracker.samples[-1].wall)
+
+
+def test_parses_progress_blocks():
+    tracker = ProgressTracker("name_")
+    lines = ["frame=10", "bitrate=N/A", "total_size=4000", "out_time_us=500000", "speed=1.01x"]
+    assert all(tracker.feed(x) is None for x in lines)
+
+    parsed = tracker.feed("progress=continue")
+    assert parsed is not None
+    assert (parsed.frame, parsed.bitrate, parsed.out_time_us, parsed.speed) == (10, 0.0, 500000, 1.01)
+
+
+def test_stats_while_another_thread_feeds():
+    tracker = ProgressTracker("name_")
+    block = ["frame=1", "total_size=100", "out_time_us=1", "progress=continue"]
+    done = Event()
+
+    def writer() -> None:
+        while not done.is_set():
+            for line in block:
+                tracker.feed(line)
+
+    thread = Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(20000):
+            tracker.stats()
+    finally:
+        done.set()
+        thread.join()
@@ -0,0 +1,100 @@
+import os
+from concurrent.futures import Future
+from pathlib import Path
+
+import pytest
+
+from app.sites import finalize
+from app.sites.finalize import InFlight, finalize_streamer
+
+
+class HeldExecutor:
+    """Jobs stay pending until the test resolves them"""
+
+    def __init__(self) -> None:
+        self.jobs: list[tuple[list[str], Future[str | None]]] = []
+
+    def submit(self, fn, parts: list[str]) -> Future[str | None]:
+        future: Future[str | None] = Future()
+        self.jobs.append((parts, future))
+        return future
+
+
+class Mover:
+    def __init__(self) -> None:
+        self.files: list[Path] = []
+
+    def submit(self, name_: str, file: Path) -> None:
+        self.files.append(file)
+
+
+@pytest.fixture
+def executor(monkeypatch) -> HeldExecutor:
+    held = HeldExecutor()
+    monkeypatch.setattr(finalize, "get_finalizer", lambda: held)
+    monkeypatch.setattr(finalize, "get_mover", Mover)
+    in_flight = InFlight()
+    monkeypatch.setattr(finalize, "get_in_flight", lambda: in_flight)
+    return held
+
+
+def part(folder: Path, stamp: str, seconds: int = 600) -> Path:
+    # by default cut short after 10 minutes, like a capture that restarted
+    file = Path(folder, f"name_ (2024-11-20) {stamp}.mkv")
+    file.write_bytes(b"x")
+    started = finalize.part_start(file)
+    assert started is not None
+    os.utime(file, (started.timestamp() + seconds, started.timestamp() + seconds))
+    return file
+
+
+def test_second_release_leaves_in_flight_parts_alone(tmp_path: Path, executor: HeldExecutor):
+    first = part(tmp_path, "100000")
+    second = part(tmp_path, "101100")
+
+    finalize_streamer("name_", tmp_path)
+    finalize_streamer("name_", tmp_path)
+
+    assert [x for x, _ in executor.jobs] == [[str(first), str(second)]]
+
+    # once the join lands the parts are free again
+    executor.jobs[0][1].set_result(None)
+    finalize_streamer("name_", tmp_path)
+    assert len(executor.jobs) == 2
+
+
+def test_full_length_segments_stay_separate(tmp_path: Path, executor: HeldExecutor):
+    length = finalize.config.video_length_seconds
+    segments = [part(tmp_path, x, length) for x in ("100000", "103000")]
+    # the broadcast ended a few minutes into the last segment
+    segments.append(part(tmp_path, "110000", 300))
+
+    finalize_streamer("name_", tmp_path)
+
+    assert executor.jobs == []
+
+
+def test_timed_parts_are_joined(tmp_path: Path, executor: HeldExecutor, monkeypatch):
+    monkeypatch.setattr(finalize.config, "capture_mode", "timed")
+    length = finalize.config.video_length_seconds
+    parts = [part(tmp_path, x, length) for x in ("100000", "103000")]
+
+    finalize_streamer("name_", tmp_path)
+
+    assert [x for x, _ in executor.jobs] == [[str(x) for x in parts]]
+
+
+def test_concat_list_files_are_unique(tmp_path: Path, monkeypatch):
+    lists: list[Path] = []
+
+    def run(args, **_):
+        lists.append(Path(args[args.index("-i") + 1]))
+        return finalize.subprocess.CompletedProcess(args, 1)
+
+    monkeypatch.setattr(finalize.subprocess, "run", run)
+    parts = [str(part(tmp_path, x)) for x in ("100000", "101100")]
+
+    assert finalize.concat_session(parts) is None
+    assert finalize.concat_session(parts) is None
+    assert lists[0] != lists[1]
+    assert not any(x.exists() for x in lists)
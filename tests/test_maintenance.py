@@ -0,0 +1,24 @@
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+from app.database.maintenance import incremental_vacuum
+
+
+def freelist(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def test_incremental_vacuum_frees_every_page(tmp_path: Path):
+    with closing(sqlite3.connect(Path(tmp_path, "vacuum.sqlite3"))) as conn:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("CREATE TABLE items (name TEXT)")
+        conn.executemany("INSERT INTO items VALUES (?)", [("x" * 500,) for _ in range(2000)])
+        conn.commit()
+        conn.execute("DELETE FROM items")
+        conn.commit()
+        assert freelist(conn) > 100
+
+        incremental_vacuum(conn)
+
+        assert freelist(conn) == 0
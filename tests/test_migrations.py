@@ -0,0 +1,136 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from app.config.settings import get_settings
+from app.database import db_query
+from app.database.migrations import MIGRATIONS, migrate
+from app.database.pool import ConnectionPool
+
+config = get_settings()
+
+# the schema every database started from before migrations existed
+SCHEMA_V0 = Path(Path(__file__).parent, "data", "schema_v0.sql")
+
+
+def connect(path: Path, script: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.executescript(script.read_text(encoding="utf-8"))
+    return conn
+
+
+def schema(conn: sqlite3.Connection) -> dict[str, object]:
+    # compared by structure, sqlite keeps the CREATE text as written
+    shape: dict[str, object] = {}
+    for type_, name_, table, sql in conn.execute(
+        "SELECT type, name, tbl_name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"
+    ):
+        if type_ == "table":
+            shape[name_] = conn.execute(f"PRAGMA table_xinfo({name_})").fetchall()
+        elif type_ == "index":
+            where = " ".join(sql.split()).partition(" WHERE ")[2]
+            columns = conn.execute(f"PRAGMA index_info({name_})").fetchall()
+            shape[name_] = (table, columns, where)
+    return shape
+
+
+def test_new_database_matches_migrated(tmp_path: Path):
+    old = connect(Path(tmp_path, "old.sqlite3"), SCHEMA_V0)
+    new = connect(Path(tmp_path, "new.sqlite3"), config.DB_TABLES)
+
+    assert migrate(old) == MIGRATIONS[-1].version
+    assert new.execute("PRAGMA user_version").fetchone()[0] == MIGRATIONS[-1].version
+    assert schema(old) == schema(new)
+
+
+def test_migrate_converts_existing_rows(tmp_path: Path):
+    conn = connect(Path(tmp_path, "old.sqlite3"), SCHEMA_V0)
+    conn.executemany(
+        "INSERT INTO chaturbate (streamer_name, last_broadcast, follow, block_date) VALUES (?, ?, ?, ?)",
+        [
+            ("a", "2024-11-20 10:00:00", "2024-11-01 08:30:00", None),
+            ("b", None, None, "2024-11-02 09:00:00"),
+            ("c", "not a date", None, None),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO num_streamers (query, type_, num_) VALUES (?, ?, ?)",
+        [("2024-11-20 10:00:10", "total", 5), ("2024-11-20 10:00:40", "total", 7)],
+    )
+    conn.commit()
+
+    migrate(conn)
+
+    rows = dict(
+        (x, y) for x, *y in conn.execute(
+            "SELECT streamer_name, last_broadcast, follow, block_date FROM chaturbate"
+        )
+    )
+    assert all(isinstance(x, int) for x in (*rows["a"][:2], rows["b"][2]))
+    assert rows["b"][:2] == [None, None]
+    # unparsable text keeps meaning "set"
+    assert isinstance(rows["c"][0], int)
+    assert conn.execute("SELECT type_, num_ FROM site_minute").fetchall() == [("total", 7)]
+
+
+def test_migrate_is_idempotent(tmp_path: Path):
+    conn = connect(Path(tmp_path, "old.sqlite3"), SCHEMA_V0)
+    version = migrate(conn)
+    before = schema(conn)
+
+    assert migrate(conn) == version
+    assert schema(conn) == before
+
+
+@pytest.fixture
+def seeded(tmp_path: Path, monkeypatch):
+    path = Path(tmp_path, "plans.sqlite3")
+    with connect(path, config.DB_TABLES) as conn:
+        # mostly unfollowed rows, like a database fed by the roomlist scrape
+        conn.executemany(
+            "INSERT INTO chaturbate (streamer_name, follow, pid, recorded) VALUES (?, ?, ?, ?)",
+            [
+                (f"streamer_{x}", 1 if x % 20 == 0 else None, x if x % 100 == 0 else None, x % 7)
+                for x in range(5000)
+            ],
+        )
+        conn.execute("ANALYZE")
+    conn.close()
+
+    pool = ConnectionPool(path)
+    monkeypatch.setattr(db_query, "get_pool", lambda: pool)
+    yield pool
+    pool.close()
+
+
+# name lookups through json_each must search the key, never scan the table
+KEY_LOOKUP = "(streamer_name=?)"
+
+
+@pytest.mark.parametrize(
+    ("query", "args", "expected"),
+    [
+        (db_query.db_get_all, (), "idx_following"),
+        (db_query.db_followed, (), "idx_followed"),
+        (db_query.db_poll_data, (), "idx_followed"),
+        (db_query.db_offline, ("last_broadcast",), "idx_followed"),
+        (db_query.db_capture, ("streamer_name",), "idx_capturing"),
+        (db_query.db_validate_pid, (), "idx_capturing"),
+        (db_query.db_all_pids, (), "idx_capturing"),
+        (db_query.db_recorded, (["streamer_1", "streamer_2"],), KEY_LOOKUP),
+        (db_query.db_followed_in, (["streamer_20"],), KEY_LOOKUP),
+    ],
+)
+def test_hot_queries_use_their_index(seeded: ConnectionPool, query, args, expected):
+    statements: list[str] = []
+    with seeded.read() as cursor:
+        cursor.connection.set_trace_callback(statements.append)
+
+    query(*args)
+
+    with seeded.read() as cursor:
+        cursor.connection.set_trace_callback(None)
+        plan = " ".join(x[-1] for x in cursor.execute(f"EXPLAIN QUERY PLAN {statements[-1]}"))
+
+    assert expected in plan, plan
@@ -0,0 +1,70 @@
+import asyncio
+from time import monotonic, sleep
+
+import pytest
+
+from app.utils.rate_limit import HostLimiter
+
+
+@pytest.fixture
+def limiter() -> HostLimiter:
+    return HostLimiter("example.com", rate=8.0, min_rate=0.5, max_rate=40.0)
+
+
+def test_burst_within_bucket_is_free(limiter: HostLimiter):
+    assert [limiter.reserve() for _ in range(5)] == [0.0] * 5
+    # the sixth waits for one token at the current rate
+    assert limiter.reserve() == pytest.approx(1 / 8, rel=0.1)
+
+
+def test_one_decrease_per_congestion_event(limiter: HostLimiter):
+    # a burst of 429s for requests that were all in flight together
+    for _ in range(6):
+        limiter.record(429, 0.2)
+
+    assert limiter.rate == 4.0
+    assert limiter.throttled == 6
+    assert limiter.tokens <= 0
+
+
+def test_requests_sent_after_a_cut_can_cut_again(limiter: HostLimiter):
+    limiter.record(429, 0.2)
+    sleep(0.01)
+    limiter.record(429, 0.0)
+
+    assert limiter.rate == 2.0
+
+
+def test_rate_never_drops_below_min(limiter: HostLimiter):
+    for _ in range(10):
+        limiter.record(429, 0.0)
+        sleep(0.001)
+
+    assert limiter.rate == limiter.min_rate
+
+
+def test_slow_responses_back_off_once_per_event(limiter: HostLimiter):
+    for _ in range(5):
+        limiter.record(200, 5.0)
+
+    assert limiter.rate == pytest.approx(8.0 * 0.9)
+
+
+def test_additive_increase_up_to_max(limiter: HostLimiter):
+    limiter.record(200, 0.1)
+    assert limiter.rate == pytest.approx(8.0 + 1 / 8)
+
+    for _ in range(5000):
+        limiter.record(200, 0.1)
+    assert limiter.rate == limiter.max_rate
+
+
+def test_acquire_paces_after_the_burst(limiter: HostLimiter):
+    async def run() -> float:
+        start_ = monotonic()
+        for _ in range(9):
+            await limiter.acquire()
+        return monotonic() - start_
+
+    # 5 from the bucket, 4 more at 8 req/s
+    assert asyncio.run(run()) == pytest.approx(0.5, abs=0.1)
@@ -0,0 +1,39 @@
+from app.utils.roomlist_pages import PAGE_SIZE, RoomlistPages
+
+
+def page(offset: int, count: int = PAGE_SIZE) -> list[tuple[str, int, int]]:
+    return [(f"name_{offset + x}", 10, 100) for x in range(count)]
+
+
+def test_failed_page_stays_unknown():
+    pages = RoomlistPages(top_pages=0, max_skip=4)
+    pages.start_cycle()
+
+    assert not pages.record(PAGE_SIZE, None)
+    assert pages.due(PAGE_SIZE)
+    assert not pages.past_end(PAGE_SIZE)
+
+
+def test_skipped_pages_keep_their_rooms():
+    pages = RoomlistPages(top_pages=0, max_skip=4)
+    pages.start_cycle()
+    pages.record(0, page(0))
+    pages.record(PAGE_SIZE, page(PAGE_SIZE, 10))
+
+    # offset 0 skipped this cycle, only the tail is fetched again
+    pages.start_cycle()
+    pages.record(PAGE_SIZE, page(PAGE_SIZE, 10))
+
+    assert pages.cached([0]) == {x for x, _, _ in page(0)}
+
+
+def test_rooms_past_the_end_are_not_cached():
+    pages = RoomlistPages(top_pages=0, max_skip=4)
+    pages.start_cycle()
+    pages.record(PAGE_SIZE, page(PAGE_SIZE))
+
+    pages.start_cycle()
+    # the list shrank, the tail page is now empty
+    pages.record(PAGE_SIZE, [])
+
+    assert pages.cached([PAGE_SIZE]) == set()
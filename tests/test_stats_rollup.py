@@ -0,0 +1,69 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from app.config.settings import get_settings
+from app.database import db_writer, db_writes
+from app.database.db_writer import DbWriter
+from app.database.db_writes import db_rollup_stats
+from app.database.pool import ConnectionPool
+
+config = get_settings()
+
+DAY = 86400
+
+
+@pytest.fixture
+def pool(tmp_path: Path, monkeypatch):
+    path = Path(tmp_path, "stats.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.executescript(config.DB_TABLES.read_text(encoding="utf-8"))
+    conn.close()
+
+    pool = ConnectionPool(path)
+    monkeypatch.setattr(db_writer, "get_pool", lambda: pool)
+    writer = DbWriter(0.001)
+    monkeypatch.setattr(db_writes, "get_writer", lambda: writer)
+    yield pool
+    pool.close()
+
+
+def rows(pool: ConnectionPool, sql: str) -> list[tuple[int, ...]]:
+    with pool.read() as cursor:
+        return cursor.execute(sql).fetchall()
+
+
+def seed_minutes(pool: ConnectionPool, start: int, minutes: int) -> None:
+    values = [(start // 60 + x, 1, 10 + x % 60, 500) for x in range(minutes)]
+    with sqlite3.connect(pool.path) as conn:
+        conn.executemany("INSERT INTO stats_minute VALUES (?, ?, ?, ?)", values)
+    conn.close()
+
+
+def test_rollup_keeps_minutes_the_next_tier_does_not_hold(pool):
+    start = 100 * DAY
+    seed_minutes(pool, start, 180)
+
+    # three complete hours roll up, the minutes stay until retention
+    db_rollup_stats(start + 3 * 3600 + 60).result(timeout=5)
+    hours = rows(pool, "SELECT hour, viewers_max, samples FROM stats_hour ORDER BY hour")
+    assert [x[0] for x in hours] == [start // 3600, start // 3600 + 1, start // 3600 + 2]
+    assert all(x[2] == 60 for x in hours)
+
+    # far past retention, minutes are still only trimmed below the newest hour
+    db_rollup_stats(start + 30 * DAY).result(timeout=5)
+    newest = rows(pool, "SELECT MAX(hour) FROM stats_hour")[0][0]
+    oldest = rows(pool, "SELECT MIN(minute) FROM stats_minute")[0][0]
+    assert oldest == newest * 60
+
+
+def test_rollup_is_idempotent(pool):
+    start = 100 * DAY
+    seed_minutes(pool, start, 120)
+
+    db_rollup_stats(start + 2 * 3600).result(timeout=5)
+    first = rows(pool, "SELECT * FROM stats_hour")
+    db_rollup_stats(start + 2 * 3600).result(timeout=5)
+
+    assert rows(pool, "SELECT * FROM stats_hour") == first
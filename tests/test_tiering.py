@@ -0,0 +1,36 @@
+import errno
+from pathlib import Path
+
+import pytest
+
+from app.sites import tiering
+from app.sites.tiering import move_file
+
+
+def test_failed_copy_leaves_no_partial_file(tmp_path: Path, monkeypatch):
+    source = Path(tmp_path, "staging", "part.mkv")
+    source.parent.mkdir()
+    source.write_bytes(b"x" * 1024)
+    target = Path(tmp_path, "archive", "part.mkv")
+
+    def full(*_) -> int:
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(tiering, "_copy_chunk", full)
+
+    with pytest.raises(OSError):
+        move_file(source, target, 1 << 30)
+
+    assert list(target.parent.iterdir()) == []
+    assert source.exists()
+
+
+def test_move_replaces_staged_file(tmp_path: Path):
+    source = Path(tmp_path, "part.mkv")
+    source.write_bytes(b"x" * 1024)
+    target = Path(tmp_path, "archive", "part.mkv")
+
+    move_file(source, target, 1 << 30)
+
+    assert target.read_bytes() == b"x" * 1024
+    assert not source.exists()